@@ -4,17 +4,24 @@ Provides an autonomous agent that can proactively use tools to accomplish tasks
 """
 
 import asyncio
-import aiohttp
+import httpx
+import ahocorasick
 import aioconsole
+import aiofiles
 import logging
+import heapq
+import math
+import re
 from typing import Dict, List, Optional, Union
+from collections import deque, OrderedDict, Counter
 from dataclasses import dataclass, asdict
 from enum import Enum
-import json
+import orjson
+import os
 from pathlib import Path
 import threading
+import time
 from datetime import datetime
-import uuid
 from rich.console import Console
 from rich.markdown import Markdown
 from rich.panel import Panel
@@ -35,6 +42,38 @@ logger = logging.getLogger(__name__)
 # Setup rich console
 console = Console()
 
+async def _dump_json(obj: object, filename: str):
+    """Serialize obj to a JSON file with orjson without blocking the event loop"""
+    data = orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_DATACLASS)
+    async with aiofiles.open(filename, 'wb') as f:
+        await f.write(data)
+
+async def _load_json(filename: str):
+    """Load a JSON file with orjson without blocking the event loop"""
+    async with aiofiles.open(filename, 'rb') as f:
+        return orjson.loads(await f.read())
+
+_last_iso_ts = 0.0
+_last_iso = ""
+
+def _now_iso() -> str:
+    """Current time as ISO string, cached per millisecond to avoid re-formatting bursts"""
+    global _last_iso_ts, _last_iso
+    now = time.time()
+    if now - _last_iso_ts >= 0.001:
+        _last_iso_ts = now
+        _last_iso = datetime.fromtimestamp(now).isoformat()
+    return _last_iso
+
+def _id_gen(batch: int = 64):
+    """Yield 32-char hex IDs from batched os.urandom reads (one syscall per batch)"""
+    while True:
+        buf = os.urandom(16 * batch)
+        for i in range(batch):
+            yield buf[i * 16:(i + 1) * 16].hex()
+
+_next_id = _id_gen().__next__
+
 class AgentState(Enum):
     IDLE = "idle"
     PLANNING = "planning"
@@ -48,36 +87,31 @@ class ConversationHistory:
     max_history: int = 100
     
     def __post_init__(self):
-        if self.messages is None:
-            self.messages = []
-            
+        # deque handles the max_history cap with O(1) eviction
+        self.messages = deque(self.messages or [], maxlen=self.max_history)
+
     def add_message(self, role: str, content: str):
         """Add a message to history"""
         message = {
-            "id": str(uuid.uuid4()),
+            "id": _next_id(),
             "role": role,
             "content": content,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": _now_iso()
         }
         self.messages.append(message)
-        
-        # Trim history if needed
-        if len(self.messages) > self.max_history:
-            self.messages = self.messages[-self.max_history:]
-            
-    def save(self, filename: str = "chat_history.json"):
+
+    async def save(self, filename: str = "chat_history.json"):
         """Save conversation history"""
-        with open(filename, 'w') as f:
-            json.dump({"messages": self.messages}, f, indent=2)
-            
-    def load(self, filename: str = "chat_history.json"):
+        await _dump_json({"messages": list(self.messages)}, filename)
+
+    async def load(self, filename: str = "chat_history.json"):
         """Load conversation history"""
         try:
-            with open(filename) as f:
-                data = json.load(f)
-                self.messages = data.get("messages", [])
-        except FileNotFoundError:
-            self.messages = []
+            data = await _load_json(filename)
+            messages = data.get("messages", [])
+        except (FileNotFoundError, orjson.JSONDecodeError):
+            messages = []
+        self.messages = deque(messages, maxlen=self.max_history)
 
 @dataclass
 class Task:
@@ -92,19 +126,19 @@ class Task:
     
     def __post_init__(self):
         if not self.id:
-            self.id = str(uuid.uuid4())
+            self.id = _next_id()
         if self.results is None:
             self.results = []
             
     def start(self):
         """Mark task as started"""
         self.status = "running"
-        self.start_time = datetime.now().isoformat()
+        self.start_time = _now_iso()
         
     def complete(self, success: bool = True):
         """Mark task as completed"""
         self.status = "success" if success else "failed"
-        self.end_time = datetime.now().isoformat()
+        self.end_time = _now_iso()
         
     def to_dict(self) -> Dict:
         """Convert task to dictionary"""
@@ -113,67 +147,85 @@ class Task:
 class TaskManager:
     def __init__(self):
         self.tasks: List[Task] = []
+        self._by_id: Dict[str, Task] = {}
         self.max_tasks = 1000
-        
+
     def create_task(self, goal: str, steps: List[Dict]) -> Task:
         """Create a new task"""
-        task = Task(id=str(uuid.uuid4()), goal=goal, steps=steps)
+        # Let Task.__post_init__ assign the ID; no point generating one twice
+        task = Task(id="", goal=goal, steps=steps)
         self.tasks.append(task)
-        
+        self._by_id[task.id] = task
+
         # Trim task history if needed
         if len(self.tasks) > self.max_tasks:
             self.tasks = self.tasks[-self.max_tasks:]
-            
+            self._by_id = {t.id: t for t in self.tasks}
+
         return task
-        
+
     def get_task(self, task_id: str) -> Optional[Task]:
         """Get task by ID"""
-        for task in self.tasks:
-            if task.id == task_id:
-                return task
-        return None
+        return self._by_id.get(task_id)
         
-    def save_tasks(self, filename: str = "tasks.json"):
+    async def save_tasks(self, filename: str = "tasks.json"):
         """Save tasks to file"""
-        with open(filename, 'w') as f:
-            json.dump({"tasks": [t.to_dict() for t in self.tasks]}, f, indent=2)
-            
-    def load_tasks(self, filename: str = "tasks.json"):
+        # orjson serializes the Task dataclasses directly, no asdict pass needed
+        await _dump_json({"tasks": self.tasks}, filename)
+
+    async def load_tasks(self, filename: str = "tasks.json"):
         """Load tasks from file"""
         try:
-            with open(filename) as f:
-                data = json.load(f)
-                self.tasks = [Task(**t) for t in data.get("tasks", [])]
+            data = await _load_json(filename)
+            self.tasks = [Task(**t) for t in data.get("tasks", [])]
         except FileNotFoundError:
             self.tasks = []
+        self._by_id = {t.id: t for t in self.tasks}
 
 class ToolManager:
     def __init__(self, tool_url: str = "http://localhost:3000/api/tools"):
         self.tool_url = tool_url
-        self.execution_history = []
-        
+        self.execution_history: deque = deque(maxlen=10_000)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Lazily create and reuse an HTTP/2 client with pooled connections"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                http2=True,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+                timeout=30.0
+            )
+        return self._client
+
+    async def close(self):
+        """Close the shared HTTP client"""
+        if self._client and not self._client.is_closed:
+            await self._client.aclose()
+
     async def execute_tool(self, tool_name: str, parameters: Dict) -> Optional[Dict]:
         """Execute a specific tool"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    self.tool_url,
-                    json={"name": tool_name, "parameters": parameters}
-                ) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        self.execution_history.append({
-                            "tool": tool_name,
-                            "parameters": parameters,
-                            "timestamp": datetime.now().isoformat(),
-                            "success": True
-                        })
-                        return result
+            client = self._get_client()
+            response = await client.post(
+                self.tool_url,
+                content=orjson.dumps({"name": tool_name, "parameters": parameters}),
+                headers={"Content-Type": "application/json"}
+            )
+            if response.status_code == 200:
+                result = orjson.loads(response.content)
+                self.execution_history.append({
+                    "tool": tool_name,
+                    "parameters": parameters,
+                    "timestamp": _now_iso(),
+                    "success": True
+                })
+                return result
                         
             self.execution_history.append({
                 "tool": tool_name,
                 "parameters": parameters,
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": _now_iso(),
                 "success": False
             })
             return None
@@ -185,30 +237,47 @@ class ToolManager:
 class ModelManager:
     def __init__(self, model_url: str = "http://localhost:3000/api/generate"):
         self.model_url = model_url
-        self.execution_history = []
-        
+        self.execution_history: deque = deque(maxlen=10_000)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Lazily create and reuse an HTTP/2 client with pooled connections"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                http2=True,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+                timeout=30.0
+            )
+        return self._client
+
+    async def close(self):
+        """Close the shared HTTP client"""
+        if self._client and not self._client.is_closed:
+            await self._client.aclose()
+
     async def execute_model(self, model_name: str, parameters: Dict) -> Optional[Dict]:
         """Execute a specific model"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    self.model_url,
-                    json={"name": model_name, "parameters": parameters}
-                ) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        self.execution_history.append({
-                            "model": model_name,
-                            "parameters": parameters,
-                            "timestamp": datetime.now().isoformat(),
-                            "success": True
-                        })
-                        return result
+            client = self._get_client()
+            response = await client.post(
+                self.model_url,
+                content=orjson.dumps({"name": model_name, "parameters": parameters}),
+                headers={"Content-Type": "application/json"}
+            )
+            if response.status_code == 200:
+                result = orjson.loads(response.content)
+                self.execution_history.append({
+                    "model": model_name,
+                    "parameters": parameters,
+                    "timestamp": _now_iso(),
+                    "success": True
+                })
+                return result
                         
             self.execution_history.append({
                 "model": model_name,
                 "parameters": parameters,
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": _now_iso(),
                 "success": False
             })
             return None
@@ -221,8 +290,16 @@ class MemorySystem:
     def __init__(self):
         self.working_memory: Dict = {}
         self.long_term_memory: List[Dict] = []
-        self.context_window: List[Dict] = []
         self.max_context_size = 50
+        self.context_window: deque = deque(maxlen=self.max_context_size)
+        # Relevance index: token set per context entry plus document frequencies
+        self._context_tokens: deque = deque()
+        self._doc_freq: Counter = Counter()
+
+    @staticmethod
+    def _tokenize(item: object) -> set:
+        """Token set for a context entry or query"""
+        return set(re.findall(r"\w+", str(item).lower()))
         
     def add_to_working_memory(self, key: str, value: object):
         """Add item to working memory"""
@@ -232,33 +309,114 @@ class MemorySystem:
         """Store item in long-term memory"""
         self.long_term_memory.append({
             **item,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": _now_iso()
         })
         
     def update_context(self, item: Dict):
         """Update context window"""
+        # Keep document frequencies in sync with whatever the deque evicts
+        if len(self.context_window) == self.max_context_size:
+            self._doc_freq.subtract(self._context_tokens.popleft())
+        tokens = self._tokenize(item)
         self.context_window.append(item)
-        if len(self.context_window) > self.max_context_size:
-            self.context_window.pop(0)
-            
+        self._context_tokens.append(tokens)
+        self._doc_freq.update(tokens)
+
+    def replace_context(self, items: List[Dict]):
+        """Reset the context window and rebuild the relevance index"""
+        self.context_window = deque(items, maxlen=self.max_context_size)
+        self._context_tokens = deque(self._tokenize(i) for i in self.context_window)
+        self._doc_freq = Counter()
+        for tokens in self._context_tokens:
+            self._doc_freq.update(tokens)
+
     def get_relevant_context(self, query: str) -> List[Dict]:
-        """Get context relevant to query"""
-        # Implement relevance scoring and filtering
-        return self.context_window[-10:]  # Simplified for now
+        """Get the top context entries scored by TF-IDF overlap with query"""
+        if not self.context_window:
+            return []
+        query_tokens = self._tokenize(query)
+        total = len(self.context_window)
+        scored = []
+        for index, (item, tokens) in enumerate(zip(self.context_window, self._context_tokens)):
+            score = sum(
+                math.log((1 + total) / (1 + self._doc_freq[token]))
+                for token in query_tokens if token in tokens
+            )
+            if score > 0:
+                scored.append((score, index, item))
+        if not scored:
+            # Nothing overlaps the query; fall back to recency
+            return list(self.context_window)[-10:]
+        return [item for _, _, item in heapq.nlargest(10, scored)]
 
 class PlanningSystem:
+    # Keywords the planner recognizes in model responses and goals
+    PLAN_KEYWORDS = (
+        "read", "write", "file", "search", "code", "check", "error",
+        "ask", "query", "question", "what", "how", "why"
+    )
+    QUESTION_WORDS = frozenset(["ask", "query", "question", "what", "how", "why"])
+
     def __init__(self):
         self.current_plan: Optional[List[Dict]] = None
         self.fallback_strategies: Dict[str, List[Dict]] = {}
         self.planning_rules = self._load_planning_rules()
+        self._keyword_automaton = self._build_keyword_automaton()
+        self._plan_cache: OrderedDict = OrderedDict()
+        self._plan_cache_size = 128
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @staticmethod
+    def _normalize_goal(goal: str) -> str:
+        """Normalize a goal for plan cache keying"""
+        return " ".join(goal.lower().split())
+
+    def cache_plan(self, goal: str, plan: List[Dict]):
+        """Remember a plan that worked for this goal (LRU, bounded)"""
+        key = self._normalize_goal(goal)
+        self._plan_cache[key] = list(plan)
+        self._plan_cache.move_to_end(key)
+        while len(self._plan_cache) > self._plan_cache_size:
+            self._plan_cache.popitem(last=False)
+
+    def invalidate(self, goal: str):
+        """Drop a cached plan after a failed execution"""
+        self._plan_cache.pop(self._normalize_goal(goal), None)
+
+    def _build_keyword_automaton(self) -> "ahocorasick.Automaton":
+        """Build an Aho-Corasick automaton matching all plan keywords in one pass"""
+        automaton = ahocorasick.Automaton()
+        for keyword in self.PLAN_KEYWORDS:
+            automaton.add_word(keyword, keyword)
+        automaton.make_automaton()
+        return automaton
+
+    def _match_keywords(self, text: str) -> set:
+        """Find all plan keywords in text with a single automaton scan"""
+        return {keyword for _, keyword in self._keyword_automaton.iter(text)}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Lazily create and reuse an HTTP/2 client with pooled connections"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                http2=True,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+                timeout=30.0
+            )
+        return self._client
+
+    async def close(self):
+        """Close the shared HTTP client"""
+        if self._client and not self._client.is_closed:
+            await self._client.aclose()
         
     def _load_planning_rules(self) -> Dict:
-        """Load planning rules from JSON file"""
+        """Load planning rules from JSON file (sync: runs once at init, before the loop)"""
         try:
-            with open('planning_rules.json', 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            logger.error("Planning rules file not found, using default rules")
+            return orjson.loads(Path('planning_rules.json').read_bytes())
+        except (FileNotFoundError, orjson.JSONDecodeError):
+            logger.error("Planning rules file missing or invalid, using default rules")
             return {
                 "task_patterns": {},
                 "compound_tasks": {}
@@ -276,17 +434,18 @@ class PlanningSystem:
                 line = line.strip().lower()
                 if not line:
                     continue
-                    
-                # Look for tool mentions in the response
-                if "read" in line and "file" in line:
+
+                # Look for tool mentions with one automaton pass per line
+                matched = self._match_keywords(line)
+                if "read" in matched and "file" in matched:
                     plan.append({"action": "read_file", "tool": "read_file"})
-                elif "write" in line and "file" in line:
+                elif "write" in matched and "file" in matched:
                     plan.append({"action": "write_file", "tool": "write_file"})
-                elif "search" in line and "code" in line:
+                elif "search" in matched and "code" in matched:
                     plan.append({"action": "search_code", "tool": "semantic_search"})
-                elif "check" in line and "error" in line:
+                elif "check" in matched and "error" in matched:
                     plan.append({"action": "analyze_code", "tool": "get_errors"})
-                elif any(word in line for word in ["ask", "query", "question", "what", "how", "why"]):
+                elif matched & self.QUESTION_WORDS:
                     plan.append({"action": "model1", "tool": "model1"})
                     
             # If no specific tools were identified, use model response
@@ -300,11 +459,19 @@ class PlanningSystem:
             # Fallback to basic plan
             return [{"action": "model1", "tool": "model1"}]
     
-    def create_plan(self, goal: str, context: List[Dict]) -> List[Dict]:
+    async def create_plan(self, goal: str, context: List[Dict]) -> List[Dict]:
         """Create execution plan for goal using model"""
+        # Serve repeat goals from the plan cache, skipping the model round-trip
+        key = self._normalize_goal(goal)
+        cached = self._plan_cache.get(key)
+        if cached is not None:
+            self._plan_cache.move_to_end(key)
+            self.current_plan = list(cached)
+            return self.current_plan
+
         try:
             # First try to get a plan from the model
-            result = asyncio.run(self._get_model_plan(goal))
+            result = await self._get_model_plan(goal)
             
             if result:
                 # Parse model response into a plan
@@ -334,38 +501,52 @@ class PlanningSystem:
             return [{"action": "model1", "tool": "model1"}]
             
     async def _get_model_plan(self, goal: str) -> Optional[str]:
-        """Get plan from model"""
+        """Get plan from model, coalescing concurrent calls for the same goal"""
+        key = self._normalize_goal(goal)
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            # Another coroutine already has this request on the wire
+            return await inflight
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    "http://localhost:3000/api/generate",
-                    json={
-                        "name": "model1",
-                        "parameters": {
-                            "ask": f"Given this task: {goal}\nWhat tools and steps are needed to complete it?",
-                            "test": "test"
-                        }
+            client = self._get_client()
+            response = await client.post(
+                "http://localhost:3000/api/generate",
+                content=orjson.dumps({
+                    "name": "model1",
+                    "parameters": {
+                        "ask": f"Given this task: {goal}\nWhat tools and steps are needed to complete it?",
+                        "test": "test"
                     }
-                ) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        return result.get("answer")
-            return None
+                }),
+                headers={"Content-Type": "application/json"}
+            )
+            answer = (
+                orjson.loads(response.content).get("answer")
+                if response.status_code == 200 else None
+            )
+            future.set_result(answer)
+            return answer
         except Exception as e:
             logger.error(f"Error getting model plan: {str(e)}")
+            future.set_result(None)
             return None
+        finally:
+            self._inflight.pop(key, None)
             
     def _create_basic_plan(self, goal: str) -> List[Dict]:
         """Create basic plan based on goal keywords"""
-        goal_lower = goal.lower()
-        
-        if "read" in goal_lower and "file" in goal_lower:
+        matched = self._match_keywords(goal.lower())
+
+        if "read" in matched and "file" in matched:
             return [{"action": "read_file", "tool": "read_file"}]
-        elif "write" in goal_lower and "file" in goal_lower:
+        elif "write" in matched and "file" in matched:
             return [{"action": "write_file", "tool": "write_file"}]
-        elif "ask" in goal_lower:
+        elif "ask" in matched:
             return [{"action": "model1", "tool": "model1"}]
-        elif "code" in goal_lower:
+        elif "code" in matched:
             return [
                 {"action": "search_code", "tool": "semantic_search"},
                 {"action": "analyze_code", "tool": "get_errors"}
@@ -387,14 +568,21 @@ class Agent:
         self.current_task: Optional[Task] = None
         self.max_retries = 3
         self.retry_delay = 1
-        
+        self._idle_interval = 60
+
+    async def close(self):
+        """Close shared HTTP sessions held by the managers"""
+        await self.tool_manager.close()
+        await self.model_manager.close()
+        await self.planning_system.close()
+
     async def _execute_with_retry(self, func, *args, **kwargs):
         """Execute a function with retry logic"""
         last_error = None
         for attempt in range(self.max_retries):
             try:
                 return await func(*args, **kwargs)
-            except aiohttp.ClientError as e:
+            except httpx.HTTPError as e:
                 last_error = e
                 if attempt < self.max_retries - 1:
                     delay = self.retry_delay * (attempt + 1)  # Exponential backoff
@@ -408,6 +596,80 @@ class Agent:
         
         raise last_error
 
+    async def _handle_ask(self, step: Dict, ask_content: str) -> Optional[Dict]:
+        """Execute a model-query step"""
+        result = await self._execute_with_retry(
+            self.model_manager.execute_model,
+            step["tool"],
+            {"ask": ask_content, "test": "test"}
+        )
+        if result and "answer" in result:
+            formatted_result = {
+                "response": result["answer"].strip(),
+                "type": "model_response"
+            }
+            self.conversation_history.add_message(
+                "assistant",
+                formatted_result["response"]
+            )
+            return {"step": step, "result": formatted_result, "success": True}
+        return None
+
+    async def _handle_read(self, step: Dict, file_name: str) -> Optional[Dict]:
+        """Execute a file-read step"""
+        logger.info(f"Attempting to read file: {file_name}")
+        # Single attempt to read the file
+        result = await self._execute_with_retry(
+            self.tool_manager.execute_tool,
+            "read_file",
+            {
+                "path": file_name,
+                "start_line": None,
+                "end_line": None
+            }
+        )
+        if result and "content" in result:
+            formatted_result = {
+                "content": result["content"],
+                "type": "file_content"
+            }
+            self.conversation_history.add_message(
+                "assistant",
+                f"Content of {file_name}:\n{formatted_result['content']}"
+            )
+            return {"step": step, "result": formatted_result, "success": True}
+
+        error_msg = f"Could not read file: {file_name}"
+        self.conversation_history.add_message("system", error_msg)
+        return {"step": step, "error": error_msg, "success": False}
+
+    async def _handle_write(self, step: Dict, write_parts: List[str]) -> Optional[Dict]:
+        """Execute a file-write step"""
+        if len(write_parts) < 4:
+            return None
+        file_name = write_parts[2].strip()
+        content = write_parts[3].strip()
+
+        result = await self._execute_with_retry(
+            self.tool_manager.execute_tool,
+            "write_file",
+            {
+                "path": file_name,
+                "content": content
+            }
+        )
+        if result and result.get("success"):
+            formatted_result = {
+                "message": f"Successfully wrote to file: {file_name}",
+                "type": "file_operation"
+            }
+            self.conversation_history.add_message(
+                "assistant",
+                formatted_result["message"]
+            )
+            return {"step": step, "result": formatted_result, "success": True}
+        return None
+
     async def handle_task(self, goal: str):
         """Handle a new task with improved error handling"""
         self.state = AgentState.PLANNING
@@ -416,125 +678,68 @@ class Agent:
         try:
             # Create task
             context = self.memory_system.get_relevant_context(goal)
-            plan = self.planning_system.create_plan(goal, context)
+            plan = await self.planning_system.create_plan(goal, context)
             self.current_task = self.task_manager.create_task(goal=goal, steps=plan)
             self.current_task.start()
             
             # Execute plan
             self.state = AgentState.EXECUTING
             results = []
-            
+
+            # The goal never changes across steps, so parse it once up front
+            goal_lower = goal.lower()
+            ask_content = ""
+            file_name = ""
+            write_parts: List[str] = []
+            if "ask" in goal_lower:
+                action = "ask"
+                ask_content = goal_lower.replace("ask", "").strip()
+            elif "read" in goal_lower and "file" in goal_lower:
+                action = "read"
+                file_name = goal_lower.replace("read", "").replace("file", "").strip()
+                # Always use relative path for workspace files
+                if Path(file_name).is_absolute():
+                    file_name = str(Path(file_name).name)
+            elif "write" in goal_lower and "file" in goal_lower:
+                action = "write"
+                write_parts = goal_lower.split(" ", 3)  # Split into: write, file, filename, content
+            else:
+                action = None
+
+            # O(1) dispatch to the per-action handler, bound to the parsed goal
+            handlers = {
+                "ask": lambda step: self._handle_ask(step, ask_content),
+                "read": lambda step: self._handle_read(step, file_name),
+                "write": lambda step: self._handle_write(step, write_parts),
+            }
+            handler = handlers.get(action)
+
             with Progress() as progress:
                 task = progress.add_task(f"[cyan]Executing task: {goal}", total=len(plan))
-                
-                for step in plan:
+                # Steps are independent HTTP calls; run them concurrently but
+                # bounded for backend politeness
+                semaphore = asyncio.Semaphore(8)
+
+                async def run_step(step: Dict) -> Optional[Dict]:
                     try:
-                        if "ask" in goal.lower():
-                            ask_content = goal.lower().replace("ask", "").strip()
-                            result = await self._execute_with_retry(
-                                self.model_manager.execute_model,
-                                step["tool"],
-                                {"ask": ask_content, "test": "test"}
-                            )
-                            if result and "answer" in result:
-                                formatted_result = {
-                                    "response": result["answer"].strip(),
-                                    "type": "model_response"
-                                }
-                                results.append({
-                                    "step": step,
-                                    "result": formatted_result,
-                                    "success": True
-                                })
-                                self.conversation_history.add_message(
-                                    "assistant", 
-                                    formatted_result["response"]
-                                )
-                        elif "read" in goal.lower() and "file" in goal.lower():
-                            command = goal.lower()
-                            file_name = command.replace("read", "").replace("file", "").strip()                            # Clean up the file name and ensure it's properly handled
-                            file_name = file_name.strip()  # Remove any leading/trailing spaces
-                            
-                            # Always use relative path for workspace files
-                            if Path(file_name).is_absolute():
-                                file_name = str(Path(file_name).name)
-                            
-                            logger.info(f"Attempting to read file: {file_name}")
-                            # Single attempt to read the file
-                            result = await self._execute_with_retry(
-                                self.tool_manager.execute_tool,
-                                "read_file",
-                                {
-                                    "path": file_name,
-                                    "start_line": None,
-                                    "end_line": None
-                                }
-                            )
-                            
-                            if result and "content" in result:
-                                formatted_result = {
-                                    "content": result["content"],
-                                    "type": "file_content"
-                                }
-                                results.append({
-                                    "step": step,
-                                    "result": formatted_result,
-                                    "success": True
-                                })
-                                self.conversation_history.add_message(
-                                    "assistant",
-                                    f"Content of {file_name}:\n{formatted_result['content']}"
-                                )
-                            else:
-                                error_msg = f"Could not read file: {file_name}"
-                                results.append({
-                                    "step": step,
-                                    "error": error_msg,
-                                    "success": False
-                                })
-                                self.conversation_history.add_message("system", error_msg)
-                        elif "write" in goal.lower() and "file" in goal.lower():
-                            command = goal.lower()
-                            parts = command.split(" ", 3)  # Split into: write, file, filename, content
-                            if len(parts) >= 4:
-                                file_name = parts[2].strip()
-                                content = parts[3].strip()
-                                
-                                result = await self._execute_with_retry(
-                                    self.tool_manager.execute_tool,
-                                    "write_file",
-                                    {
-                                        "path": file_name,
-                                        "content": content
-                                    }
-                                )
-                                
-                                if result and result.get("success"):
-                                    formatted_result = {
-                                        "message": f"Successfully wrote to file: {file_name}",
-                                        "type": "file_operation"
-                                    }
-                                    results.append({
-                                        "step": step,
-                                        "result": formatted_result,
-                                        "success": True
-                                    })
-                                    self.conversation_history.add_message(
-                                        "assistant",
-                                        formatted_result["message"]
-                                    )
-                            
+                        async with semaphore:
+                            if handler is None:
+                                return None
+                            return await handler(step)
                     except Exception as e:
                         error_msg = f"Error executing step: {str(e)}"
                         logger.error(error_msg)
-                        results.append({
+                        self.conversation_history.add_message("system", error_msg)
+                        return {
                             "step": step,
                             "error": error_msg,
                             "success": False
-                        })
-                        self.conversation_history.add_message("system", error_msg)
-                        
-                    progress.update(task, advance=1)
+                        }
+                    finally:
+                        progress.update(task, advance=1)
+
+                step_results = await asyncio.gather(*(run_step(s) for s in plan))
+                results.extend(r for r in step_results if r is not None)
                     
             # Evaluate results
             self.state = AgentState.EVALUATING
@@ -546,7 +751,8 @@ class Agent:
                 console.print(f"[red]{error_msg}[/red]")
                 self.current_task.complete(success=False)
                 self.conversation_history.add_message("system", error_msg)
-                
+                self.planning_system.invalidate(goal)
+
                 # Try to recover with fallback strategy
                 if self.planning_system.fallback_strategies:
                     console.print("[yellow]Attempting recovery with fallback strategy...[/yellow]")
@@ -556,6 +762,7 @@ class Agent:
                 console.print(f"[green]{success_msg}[/green]")
                 self.current_task.complete(success=True)
                 self.conversation_history.add_message("system", success_msg)
+                self.planning_system.cache_plan(goal, plan)
                 
             self.state = AgentState.IDLE
             return results
@@ -584,40 +791,44 @@ class Agent:
                     
                     if result and result.get("errors"):
                         console.print("[yellow]Detected code errors, initiating analysis...[/yellow]")
+                        self._idle_interval = 60
                         await self.handle_task("Analyze and suggest fixes for code errors")
-                        
+                    else:
+                        # Nothing to do; back off the poll up to 10 minutes
+                        self._idle_interval = min(self._idle_interval * 2, 600)
+
                 except Exception as e:
                     logger.error(f"Error in environment monitoring: {str(e)}")
-                    
-            await asyncio.sleep(60)  # Check every minute
+
+            await asyncio.sleep(self._idle_interval)
             
-    def save_state(self, filename: str = "agent_state.json"):
+    async def save_state(self, filename: str = "agent_state.json"):
         """Save agent state"""
         try:
             state = {
                 "working_memory": self.memory_system.working_memory,
-                "context_window": self.memory_system.context_window,
-                "tool_history": self.tool_manager.execution_history,
+                "context_window": list(self.memory_system.context_window),
+                "tool_history": list(self.tool_manager.execution_history),
                 "current_state": self.state.value
             }
-            
-            with open(filename, 'w') as f:
-                json.dump(state, f, indent=2)
-                
+
+            await _dump_json(state, filename)
+
             logger.info(f"Agent state saved to {filename}")
             
         except Exception as e:
             logger.error(f"Error saving agent state: {str(e)}")
             
-    def load_state(self, filename: str = "agent_state.json"):
+    async def load_state(self, filename: str = "agent_state.json"):
         """Load agent state"""
         try:
-            with open(filename) as f:
-                state = json.load(f)
-                
+            state = await _load_json(filename)
+
             self.memory_system.working_memory = state.get("working_memory", {})
-            self.memory_system.context_window = state.get("context_window", [])
-            self.tool_manager.execution_history = state.get("tool_history", [])
+            self.memory_system.replace_context(state.get("context_window", []))
+            self.tool_manager.execution_history = deque(
+                state.get("tool_history", []), maxlen=10_000
+            )
             self.state = AgentState(state.get("current_state", "idle"))
             
             logger.info(f"Agent state loaded from {filename}")
@@ -669,13 +880,15 @@ async def main():
                 
     finally:
         # Save agent state
-        agent.save_state()
+        await agent.save_state()
         # Cancel monitoring task
         monitor_task.cancel()
         try:
             await monitor_task
         except asyncio.CancelledError:
             pass
+        # Close shared HTTP sessions
+        await agent.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
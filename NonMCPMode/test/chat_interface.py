@@ -1,144 +1,388 @@
-"""
-Chat Interface Implementation
-Provides a terminal-based chat interface for the AI assistant
-"""
-
-import asyncio
-import aiohttp
-import logging
-import prompt_toolkit
-from prompt_toolkit import PromptSession
-from prompt_toolkit.styles import Style
-from rich.console import Console
-from rich.markdown import Markdown
-from rich.panel import Panel
-from typing import Dict, Optional
-import json
-
-# Setup logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-# Setup rich console
-console = Console()
-
-# Prompt styling
-style = Style.from_dict({
-    'prompt': 'ansiyellow bold',
-    'user-input': 'ansigreen',
-})
-
-class ChatInterface:
-    def __init__(self, model_url: str = "http://localhost:3000/generate",
-                 tool_url: str = "http://localhost:3000/api/tools"):
-        self.model_url = model_url
-        self.tool_url = tool_url
-        self.session = PromptSession()
-        self.conversation_history = []
-        
-    async def send_to_model(self, message: str) -> Optional[str]:
-        """Send message to the language model"""
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    self.model_url,
-                    json={"prompt": message, "conversation": self.conversation_history}
-                ) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        return result.get("response")
-            return None
-        except Exception as e:
-            logger.error(f"Error communicating with model: {str(e)}")
-            return None
-            
-    async def execute_tool(self, tool_name: str, parameters: Dict) -> Optional[Dict]:
-        """Execute a tool through the tool server"""
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    self.tool_url,
-                    json={"name": tool_name, "parameters": parameters}
-                ) as response:
-                    if response.status == 200:
-                        return await response.json()
-            return None
-        except Exception as e:
-            logger.error(f"Error executing tool: {str(e)}")
-            return None
-            
-    def display_response(self, response: str):
-        """Display formatted response"""
-        if response:
-            # Parse response for any code blocks
-            try:
-                md = Markdown(response)
-                console.print(Panel(md, border_style="blue"))
-            except Exception:
-                console.print(Panel(response, border_style="blue"))
-                
-    def update_history(self, role: str, content: str):
-        """Update conversation history"""
-        self.conversation_history.append({
-            "role": role,
-            "content": content
-        })
-        
-        # Keep history size manageable
-        if len(self.conversation_history) > 20:
-            self.conversation_history = self.conversation_history[-20:]
-            
-    async def start_chat(self):
-        """Start the chat interface"""
-        console.print("[bold blue]Local AI Assistant Chat[/bold blue]")
-        console.print("Type 'exit' to end the conversation\n")
-        
-        while True:
-            try:
-                # Get user input
-                user_input = await self.session.prompt_async(
-                    [('class:prompt', '> ')],
-                    style=style
-                )
-                
-                if user_input.lower() in ['exit', 'quit']:
-                    break
-                    
-                # Update history with user input
-                self.update_history("user", user_input)
-                
-                # Send to model and get response
-                response = await self.send_to_model(user_input)
-                
-                if response:
-                    # Display response
-                    self.display_response(response)
-                    
-                    # Update history with assistant's response
-                    self.update_history("assistant", response)
-                else:
-                    console.print("[red]Failed to get response from the model[/red]")
-                    
-            except KeyboardInterrupt:
-                break
-            except Exception as e:
-                logger.error(f"Error in chat interface: {str(e)}")
-                console.print(f"[red]Error: {str(e)}[/red]")
-                
-        console.print("\n[bold blue]Chat session ended[/bold blue]")
-        
-    def save_history(self, filename: str = "chat_history.json"):
-        """Save conversation history to file"""
-        try:
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(self.conversation_history, f, indent=2)
-            logger.info(f"Chat history saved to {filename}")
-        except Exception as e:
-            logger.error(f"Error saving chat history: {str(e)}")
-
-if __name__ == "__main__":
-    chat = ChatInterface()
-    try:
-        asyncio.run(chat.start_chat())
-    finally:
-        chat.save_history()
+"""
+Chat Interface Implementation
+Provides a terminal-based chat interface for the AI assistant
+"""
+
+import asyncio
+import aiohttp
+import logging
+import prompt_toolkit
+from prompt_toolkit import PromptSession
+from prompt_toolkit.styles import Style
+from rich.console import Console
+from rich.live import Live
+from rich.markdown import Markdown
+from rich.panel import Panel
+from typing import Dict, List, Optional
+from collections import deque, OrderedDict
+from pathlib import Path
+import json
+import re
+
+# Setup logging (shared, configured once)
+from logging_setup import get_logger
+logger = get_logger(__name__)
+
+# Prefer orjson for (de)serialization; fall back to stdlib json
+try:
+    import orjson
+
+    def _dumps_line(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    def _dumps_line(obj) -> bytes:
+        return (json.dumps(obj, ensure_ascii=False) + "\n").encode('utf-8')
+
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+    _loads = json.loads
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Setup rich console
+console = Console()
+
+# Prompt styling
+style = Style.from_dict({
+    'prompt': 'ansiyellow bold',
+    'user-input': 'ansigreen',
+})
+
+class SemanticCache:
+    """Response cache matching paraphrased repeats by token-set similarity"""
+
+    def __init__(self, max_entries: int = 256, threshold: float = 0.9):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self._entries: OrderedDict = OrderedDict()
+
+    @staticmethod
+    def _tokens(text: str) -> frozenset:
+        return frozenset(re.findall(r"\w+", text.lower()))
+
+    def lookup(self, message: str) -> Optional[str]:
+        """Return a cached response whose Jaccard similarity clears the threshold"""
+        tokens = self._tokens(message)
+        if not tokens:
+            return None
+        best_key, best_response, best_score = None, None, 0.0
+        for key, (entry_tokens, response) in self._entries.items():
+            overlap = len(tokens & entry_tokens)
+            if not overlap:
+                continue
+            score = overlap / len(tokens | entry_tokens)
+            if score > best_score:
+                best_key, best_response, best_score = key, response, score
+        if best_key is not None and best_score >= self.threshold:
+            self._entries.move_to_end(best_key)
+            return best_response
+        return None
+
+    def insert(self, message: str, response: str):
+        """Store a response keyed on the message only, evicting LRU entries"""
+        key = " ".join(message.lower().split())
+        self._entries[key] = (self._tokens(message), response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+class ChatInterface:
+    def __init__(self, model_url: str = "http://localhost:3000/generate",
+                 tool_url: str = "http://localhost:3000/api/tools",
+                 max_batch_size: int = 4,
+                 batch_interval_ms: int = 10):
+        self.model_url = model_url
+        self.tool_url = tool_url
+        self.max_batch_size = max_batch_size
+        self.batch_interval_ms = batch_interval_ms
+        self._batch_queue: Optional[asyncio.Queue] = None
+        self._batcher_task: Optional[asyncio.Task] = None
+        self.session = PromptSession()
+        # Split history into a never-mutated prefix plus a rotating recent
+        # window, so server-side prompt caches keyed on the prefix stay valid
+        loaded, migrated = self._load_history()
+        self._stable_prefix: list = loaded[:-20]
+        self._recent: deque = deque(loaded[-20:], maxlen=20)
+        # Serialized form of the stable prefix, extended only on commit
+        self._prefix_json: Optional[bytes] = None
+        # Append-only JSONL log: each turn writes one line, never the full file
+        self._history_fp = open('chat_history.jsonl', 'ab')
+        if migrated:
+            # First run against a legacy chat_history.json: replay its
+            # entries into the JSONL so they survive the switchover
+            try:
+                for entry in loaded:
+                    self._history_fp.write(_dumps_line(entry))
+                self._history_fp.flush()
+            except Exception as e:
+                logger.error("Error migrating legacy chat history: %s", e)
+        self._http: Optional[aiohttp.ClientSession] = None
+        self._sem_cache = SemanticCache()
+
+    @staticmethod
+    def _load_history() -> tuple:
+        """Rebuild history from the JSONL log (or the legacy JSON file)
+
+        Returns (entries, migrated); migrated is True when the entries
+        came from the legacy JSON file and still need writing to JSONL.
+        """
+        try:
+            path = Path('chat_history.jsonl')
+            if path.exists():
+                with path.open('rb') as f:
+                    return [_loads(line) for line in f if line.strip()], False
+            legacy = Path('chat_history.json')
+            if legacy.exists():
+                return _loads(legacy.read_bytes()), True
+        except Exception as e:
+            logger.error("Error loading chat history: %s", e)
+        return [], False
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Lazily create and reuse one pooled HTTP session for all requests"""
+        if self._http is None or self._http.closed:
+            self._http = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=32,
+                    ttl_dns_cache=300,
+                    keepalive_timeout=60
+                )
+            )
+        return self._http
+
+    async def send_to_model(self, message: str) -> Optional[str]:
+        """Send message to the language model via the micro-batcher"""
+        # Near-duplicate questions are answered from the local cache
+        hit = self._sem_cache.lookup(message)
+        if hit is not None:
+            return hit
+
+        if self._batch_queue is None:
+            self._batch_queue = asyncio.Queue()
+            self._batcher_task = asyncio.create_task(self._batcher())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._batch_queue.put((message, future))
+        answer = await future
+        if answer:
+            self._sem_cache.insert(message, answer)
+        return answer
+
+    async def _batcher(self):
+        """Coalesce prompts arriving within the batch window into one POST"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._batch_queue.get()]
+            deadline = loop.time() + self.batch_interval_ms / 1000
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._batch_queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._send_batch(batch)
+
+    async def _send_batch(self, batch):
+        """POST a batch of prompts in one request and fan results out"""
+        conversation = self._conversation_json()
+        try:
+            session = await self._get_session()
+            body = (b'{"prompts":' + _dumps([message for message, _ in batch]) +
+                    b',"conversations":[' + b','.join([conversation] * len(batch)) +
+                    b']}')
+            async with session.post(
+                self.model_url,
+                data=body,
+                headers=_JSON_HEADERS
+            ) as response:
+                if response.status == 200:
+                    result = await response.json()
+                    responses = result.get("responses") or [result.get("response")] * len(batch)
+                    for (_, future), answer in zip(batch, responses):
+                        if not future.done():
+                            future.set_result(answer)
+                    return
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(None)
+        except Exception as e:
+            logger.error("Error communicating with model: %s", e)
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(None)
+
+    def _conversation_json(self) -> bytes:
+        """Conversation as JSON bytes; only the recent tail is re-serialized"""
+        if self._prefix_json is None:
+            self._prefix_json = _dumps(self._stable_prefix)
+        recent = _dumps(list(self._recent))
+        if self._prefix_json == b'[]':
+            return recent
+        if recent == b'[]':
+            return self._prefix_json
+        return self._prefix_json[:-1] + b',' + recent[1:]
+
+    async def stream_from_model(self, message: str):
+        """Yield response text incrementally from the JSONL streaming endpoint"""
+        try:
+            session = await self._get_session()
+            body = (b'{"prompt":' + _dumps(message) +
+                    b',"conversation":' + self._conversation_json() +
+                    b',"stream":true}')
+            async with session.post(
+                self.model_url,
+                data=body,
+                headers=_JSON_HEADERS
+            ) as response:
+                if response.status != 200:
+                    return
+                async for line in response.content:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        chunk = _loads(line)
+                    except ValueError:
+                        continue
+                    piece = chunk.get("response") or chunk.get("token") or ""
+                    if piece:
+                        yield piece
+        except Exception as e:
+            logger.error("Error streaming from model: %s", e)
+
+    async def display_stream(self, chunks) -> str:
+        """Render a streaming response live, returning the accumulated text"""
+        text = ""
+        with Live(Panel("", border_style="blue"), console=console,
+                  refresh_per_second=8) as live:
+            async for piece in chunks:
+                text += piece
+                live.update(Panel(Markdown(text), border_style="blue"))
+        return text
+
+    async def execute_tool(self, tool_name: str, parameters: Dict) -> Optional[Dict]:
+        """Execute a tool through the tool server"""
+        try:
+            session = await self._get_session()
+            async with session.post(
+                self.tool_url,
+                json={"name": tool_name, "parameters": parameters}
+            ) as response:
+                if response.status == 200:
+                    return await response.json()
+            return None
+        except Exception as e:
+            logger.error("Error executing tool: %s", e)
+            return None
+            
+    async def execute_tools(self, calls: List[Dict]) -> List[Optional[Dict]]:
+        """Execute several tool calls concurrently over the shared session"""
+        return list(await asyncio.gather(
+            *(self.execute_tool(call["name"], call.get("parameters", {}))
+              for call in calls)
+        ))
+
+    def display_response(self, response: str):
+        """Display formatted response"""
+        if response:
+            # Parse response for any code blocks
+            try:
+                md = Markdown(response)
+                console.print(Panel(md, border_style="blue"))
+            except Exception:
+                console.print(Panel(response, border_style="blue"))
+                
+    def update_history(self, role: str, content: str):
+        """Update conversation history (append-only; old turns commit to the prefix)"""
+        message = {
+            "role": role,
+            "content": content
+        }
+        # Commit the turn the recent window would evict to the stable prefix
+        # instead of dropping it; earlier entries are never rewritten
+        if len(self._recent) == self._recent.maxlen:
+            evicted = self._recent.popleft()
+            self._stable_prefix.append(evicted)
+            # Extend the serialized prefix in place; never re-serialize it all
+            if self._prefix_json is None or self._prefix_json == b'[]':
+                self._prefix_json = _dumps(self._stable_prefix)
+            else:
+                self._prefix_json = self._prefix_json[:-1] + b',' + _dumps(evicted) + b']'
+        self._recent.append(message)
+        try:
+            self._history_fp.write(_dumps_line(message))
+        except Exception as e:
+            logger.error("Error appending chat history: %s", e)
+            
+    async def start_chat(self):
+        """Start the chat interface"""
+        console.print("[bold blue]Local AI Assistant Chat[/bold blue]")
+        console.print("Type 'exit' to end the conversation\n")
+
+        try:
+            while True:
+                try:
+                    # Get user input
+                    user_input = await self.session.prompt_async(
+                        [('class:prompt', '> ')],
+                        style=style
+                    )
+
+                    if user_input.lower() in ['exit', 'quit']:
+                        break
+
+                    # Update history with user input
+                    self.update_history("user", user_input)
+
+                    # Stream the response token by token; cache hits render at once
+                    response = self._sem_cache.lookup(user_input)
+                    if response:
+                        self.display_response(response)
+                    else:
+                        response = await self.display_stream(
+                            self.stream_from_model(user_input)
+                        )
+                        if response:
+                            self._sem_cache.insert(user_input, response)
+
+                    if response:
+                        # Update history with assistant's response
+                        self.update_history("assistant", response)
+                    else:
+                        console.print("[red]Failed to get response from the model[/red]")
+
+                except KeyboardInterrupt:
+                    break
+                except Exception as e:
+                    logger.error("Error in chat interface: %s", e)
+                    console.print(f"[red]Error: {str(e)}[/red]")
+        finally:
+            if self._batcher_task:
+                self._batcher_task.cancel()
+            if self._http and not self._http.closed:
+                await self._http.close()
+
+        console.print("\n[bold blue]Chat session ended[/bold blue]")
+        
+    def save_history(self, filename: str = "chat_history.jsonl"):
+        """Flush and close the append-only history log"""
+        try:
+            if not self._history_fp.closed:
+                self._history_fp.flush()
+                self._history_fp.close()
+            logger.info(f"Chat history saved to {filename}")
+        except Exception as e:
+            logger.error("Error saving chat history: %s", e)
+
+if __name__ == "__main__":
+    chat = ChatInterface()
+    try:
+        asyncio.run(chat.start_chat())
+    finally:
+        chat.save_history()
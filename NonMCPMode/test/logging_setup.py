@@ -0,0 +1,20 @@
+"""
+Logging Setup
+Central logging configuration shared by the NonMCPMode test modules
+"""
+
+import logging
+
+_configured = False
+
+def setup_logging(level=logging.INFO):
+    """Configure root logging exactly once, regardless of import order"""
+    global _configured
+    if not _configured:
+        logging.basicConfig(level=level)
+        _configured = True
+
+def get_logger(name: str) -> logging.Logger:
+    """Get a module logger with the shared configuration applied"""
+    setup_logging()
+    return logging.getLogger(name)
@@ -4,31 +4,100 @@ Provides a user interface that communicates with the MCP server
 """
 
 import asyncio
+import json
 import logging
-from typing import Dict, Any, Optional, List
+from logging.handlers import RotatingFileHandler
+import shlex
+import sys
+import threading
+from functools import lru_cache
+from typing import Collection, Dict, Any, Optional, List
 from rich.console import Console
-from rich.markdown import Markdown
-from rich.panel import Panel
-from rich.progress import Progress
-from rich.prompt import Prompt
-import aioconsole
 from mcpClient.mcp_client import MCPClient
 from mcpClient.server_manager import ServerManager
 
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('agent_client.log'),
-        logging.StreamHandler()
-    ]
-)
+# Setup logging; skipped when a host application already configured handlers
+if not logging.getLogger().handlers:
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            # delay=True defers opening the file until the first record
+            RotatingFileHandler('agent_client.log', maxBytes=10_000_000,
+                                backupCount=3, delay=True),
+            logging.StreamHandler()
+        ]
+    )
 logger = logging.getLogger(__name__)
 
 # Setup rich console
 console = Console()
 
+@lru_cache(maxsize=256)
+def _parse(segment: str) -> tuple:
+    """Tokenize a command line once, quote-aware; repeated input hits the cache"""
+    try:
+        return tuple(shlex.split(segment))
+    except ValueError:
+        # Unbalanced quotes; fall back to plain whitespace splitting
+        return tuple(segment.split())
+
+def _build_file_write(tokens: tuple, rest: str):
+    """Build file_write params, requiring both path and content"""
+    if len(tokens) < 3:
+        raise ValueError("file_write requires both path and content")
+    return "file_write", {"path": tokens[1], "content": " ".join(tokens[2:])}
+
+# Interned control words: equality against these is a pointer compare
+_EXIT = sys.intern("exit")
+_QUIT = sys.intern("quit")
+_SERVERS = sys.intern("servers")
+_CAPABILITIES = sys.intern("capabilities")
+_HELP = sys.intern("help")
+
+# Table-driven dispatch: command -> (method, params) builder. Builders
+# get the quote-stripped tokens and the raw remainder of the line;
+# commands the server re-parses (shell commands, search queries) take
+# the raw form so the user's quoting survives the round trip
+COMMAND_HANDLERS = {
+    "file_read": lambda tokens, rest: ("file_read", {"path": " ".join(tokens[1:])}),
+    "file_write": _build_file_write,
+    "file_search": lambda tokens, rest: ("file_search", {"pattern": rest}),
+    "code_search": lambda tokens, rest: ("code_search", {"query": rest}),
+    "execute_command": lambda tokens, rest: ("execute_command", {"command": rest}),
+    "check_errors": lambda tokens, rest: ("check_errors", {"file": " ".join(tokens[1:]) or None}),
+}
+
+# Help text per tool command, printed only for supported commands
+HELP_LINES = {
+    "file_read": "- file_read <path>: Read contents of a file",
+    "file_write": "- file_write <path> <content>: Write content to a file",
+    "file_search": "- file_search <pattern>: Search for files matching pattern",
+    "code_search": "- code_search <query>: Search code contents",
+    "execute_command": "- execute_command <command>: Execute a shell command",
+    "check_errors": "- check_errors [file]: Check for errors in file(s)",
+}
+
+class AsyncLoopThread:
+    """Long-lived event loop on a daemon thread shared by all MCP clients"""
+    _instance = None
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def instance(cls) -> "AsyncLoopThread":
+        """Get the module-wide loop thread, creating it on first use"""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def submit(self, coro):
+        """Schedule a coroutine on the shared loop; awaitable from any loop"""
+        return asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self.loop))
+
 class AgentClient:
     def __init__(self, server_type: str = None, force_stdio: bool = False, force_tcp: bool = False, 
                  tcp_host: str = None, tcp_port: int = None, config_path: str = None):
@@ -43,6 +112,31 @@ class AgentClient:
         
         # Initialize server manager
         self.server_manager = ServerManager(config_path=self.config_path)
+
+        # All client transports live on one shared event-loop thread, so
+        # switching servers rebinds the client without tearing the loop down
+        self._loop_thread = AsyncLoopThread.instance()
+
+        # Cap outstanding RPCs so bursts cannot head-of-line block the loop
+        self._inflight = asyncio.Semaphore(8)
+
+        # Capability set cached once per connection; None means unknown.
+        # _supported_commands is the precomputed intersection with the
+        # dispatch table, so the REPL does one membership test per command
+        self._capabilities: Optional[frozenset] = None
+        self._supported_commands: frozenset = frozenset()
+
+        # Heavy UI modules are imported on first use, not at module load,
+        # so importing this module stays cheap for non-interactive callers
+        from rich.progress import Progress
+        from prompt_toolkit import PromptSession
+        from prompt_toolkit.history import FileHistory
+
+        # One live Progress renderer reused for every request
+        self._progress = Progress(transient=True)
+
+        # Async-native prompt with persistent history; no reader thread per line
+        self._session = PromptSession(history=FileHistory(".agent_history"))
         
         # Initialize client with specific communication mode
         if force_stdio:
@@ -52,22 +146,55 @@ class AgentClient:
         else:
             self.client = MCPClient(server_type, config_path=self.config_path)
         
+    def _set_capabilities(self, caps):
+        """Cache the capability set and the commands it supports"""
+        if caps is None:
+            self._capabilities = None
+            self._supported_commands = frozenset()
+        else:
+            self._capabilities = frozenset(caps)
+            self._supported_commands = frozenset(COMMAND_HANDLERS) & self._capabilities
+
+    async def _request(self, coro):
+        """Run a client RPC on the shared loop, bounded by the in-flight cap"""
+        async with self._inflight:
+            return await self._loop_thread.submit(coro)
+
     async def start(self):
         """Start the agent client"""
-        try:            
-            await self.client.start()
-            
+        # Deferred UI imports; paid once when the session actually starts
+        from rich.markdown import Markdown
+        from rich.panel import Panel
+        from prompt_toolkit.patch_stdout import patch_stdout
+
+        try:
+            await self._loop_thread.submit(self.client.start())
+            self._set_capabilities(
+                await self._loop_thread.submit(self.client.get_capabilities())
+            )
+
             console.print("[bold blue]AI Agent Interface[/bold blue]")
             console.print("Type 'exit' to end the session\n")
-            
+
+            # Keep one Progress renderer running for the whole session
+            # instead of spinning a fresh render thread per command
+            self._progress.start()
+
             while True:
                 try:
-                    user_input = await aioconsole.ainput("> ")
-                    input_lower = user_input.lower()
-                    
-                    if input_lower in ['exit', 'quit']:
+                    with patch_stdout():
+                        user_input = await self._session.prompt_async("> ")
+
+                    # Control commands are single words; lowercase and intern
+                    # just that word instead of copying the whole input
+                    stripped = user_input.strip()
+                    command_word = (sys.intern(stripped.lower())
+                                    if stripped and len(stripped) <= 12 and ' ' not in stripped
+                                    else '')
+
+                    if command_word is _EXIT or command_word is _QUIT:
                         break
-                    elif input_lower == 'servers':
+                    elif command_word is _SERVERS:
                         # List available servers
                         servers = self.list_available_servers()
                         console.print("\n[bold]Available Servers:[/bold]")
@@ -77,94 +204,84 @@ class AgentClient:
                             else:
                                 console.print(f"  {server}")
                         continue
-                    elif input_lower == 'capabilities':
+                    elif command_word is _CAPABILITIES:
                         # Show current server capabilities
                         caps = await self.get_server_capabilities()
                         console.print("\n[bold]Current Server Capabilities:[/bold]")
                         for cap in caps:
                             console.print(f"- {cap}")
                         continue
-                    elif input_lower.startswith('use '):
-                        # Switch to a different server
-                        server_name = input_lower[4:].strip()
+                    elif user_input[:4].lower() == 'use ':
+                        # Switch to a different server; lowercase only the
+                        # four-byte prefix, not a long command line
+                        server_name = user_input[4:].strip().lower()
                         await self.switch_server(server_name)
                         continue
-                    elif input_lower == 'help':
+                    elif command_word is _HELP:
                         await self.show_help()
                         continue
                     
-                    # Handle tool server commands
-                    capabilities = await self.client.get_capabilities()
-                    method = None
-                    params = {}
-                    
-                    # Parse command and parameters
-                    parts = user_input.split(maxsplit=1)
-                    command = parts[0].lower()
-                    args = parts[1] if len(parts) > 1 else ""
-                    
-                    # Map commands to tool server methods
-                    if command == "file_read" and "file_read" in capabilities:
-                        method = "file_read"
-                        params = {"path": args.strip()}
-                    elif command == "file_write" and "file_write" in capabilities:
-                        try:
-                            filepath, content = args.split(maxsplit=1)
-                            method = "file_write"
-                            params = {"path": filepath.strip(), "content": content}
-                        except ValueError:
-                            console.print("[red]Error: file_write requires both path and content[/red]")
+                    # Handle tool server commands; ';' separates commands
+                    # batched into one JSON-RPC frame
+                    capabilities = self._capabilities or frozenset()
+                    requests = []
+
+                    for segment in user_input.split(';'):
+                        segment = segment.strip()
+                        if not segment:
                             continue
-                    elif command == "file_search" and "file_search" in capabilities:
-                        method = "file_search"
-                        params = {"pattern": args.strip()}
-                    elif command == "code_search" and "code_search" in capabilities:
-                        method = "code_search"
-                        params = {"query": args.strip()}
-                    elif command == "execute_command" and "execute_command" in capabilities:
-                        method = "execute_command"
-                        params = {"command": args.strip()}
-                    elif command == "check_errors" and "check_errors" in capabilities:
-                        method = "check_errors"
-                        params = {"file": args.strip() if args else None}
-                    elif "generate" in capabilities:
-                        method = "generate"
-                        params = {"ask": user_input}
-                    else:
-                        console.print("[red]Command not supported. Type 'help' to see available commands.[/red]")
-                        continue
 
-                    if method:
-                        with Progress() as progress:
-                            task = progress.add_task("[cyan]Processing request...", total=1)
-                            
-                            # Send request to server
-                            request = {
-                                "jsonrpc": "2.0",
-                                "method": method,
-                                "params": params,
-                                "id": self.client._get_next_request_id()
-                            }
-                            
-                            response = await self.client.send_request(request)
-                            progress.update(task, completed=1)
-                              # Handle response
+                        # Parse command and parameters in one quote-aware pass
+                        tokens = _parse(segment)
+                        if not tokens:
+                            continue
+                        command = sys.intern(tokens[0].lower())
+
+                        # Map commands to tool server methods via the table;
+                        # one membership test covers handler and capability
+                        if command in self._supported_commands:
+                            parts = segment.split(None, 1)
+                            rest = parts[1] if len(parts) > 1 else ""
+                            try:
+                                method, params = COMMAND_HANDLERS[command](tokens, rest)
+                            except ValueError as e:
+                                console.print(f"[red]Error: {e}[/red]")
+                                continue
+                        elif "generate" in capabilities:
+                            method = "generate"
+                            params = {"ask": segment}
+                        else:
+                            console.print("[red]Command not supported. Type 'help' to see available commands.[/red]")
+                            continue
+
+                        requests.append({
+                            "jsonrpc": "2.0",
+                            "method": method,
+                            "params": params,
+                            "id": self.client._get_next_request_id()
+                        })
+
+                    if requests:
+                        task = self._progress.add_task("[cyan]Processing request...", total=len(requests))
+                        try:
+                            # One frame for the whole batch; a single command
+                            # is just a batch of one
+                            responses = await self._request(self.client.send_batch(requests))
+                            self._progress.update(task, completed=len(requests))
+                        finally:
+                            self._progress.remove_task(task)
+
+                        # Handle responses in request order
+                        for request, response in zip(requests, responses):
+                            method = request["method"]
                             if "result" in response:
                                 result = response["result"]
                                 if method == "file_search" and isinstance(result, dict) and "files" in result:
                                     console.print("[green]Found files:[/green]")
                                     for file in result["files"]:
                                         console.print(f"- {file}")
-                                elif isinstance(result, dict):
-                                    console.print(Panel(
-                                        Markdown(str(result)),
-                                        border_style="green"
-                                    ))
                                 else:
-                                    console.print(Panel(
-                                        str(result),
-                                        border_style="green"
-                                    ))
+                                    self._render_result(result)
                             elif "error" in response:
                                 error = response["error"]
                                 console.print(Panel(
@@ -175,32 +292,74 @@ class AgentClient:
                 except KeyboardInterrupt:
                     break
                 except Exception as e:
-                    logger.error(f"Error: {str(e)}")
+                    logger.error("Error: %s", e)
                     console.print(f"[red]Error: {str(e)}[/red]")
                     
         finally:
             # Clean up resources
-            self.client.stop()
+            self._progress.stop()
+            self._set_capabilities(None)
+            await self._loop_thread.submit(self.client.stop())
             
+    def _render_result(self, result):
+        """Render a result, streaming large text instead of one-shot parsing"""
+        from rich.json import JSON
+        from rich.panel import Panel
+
+        if isinstance(result, dict):
+            # str(result) is not markdown; render dicts as highlighted JSON
+            console.print(Panel(JSON(json.dumps(result)), border_style="green"))
+            return
+        result_str = str(result)
+        if len(result_str) <= 4096:
+            console.print(Panel(result_str, border_style="green"))
+        else:
+            self._render_streaming(result_str)
+
+    def _render_streaming(self, result_str: str):
+        """Append a large result to a live panel in 4 KiB slices"""
+        from rich.live import Live
+        from rich.panel import Panel
+        from rich.text import Text
+
+        # Only one live display may run at a time; pause the progress bar
+        self._progress.stop()
+        try:
+            body = Text()
+            with Live(Panel(body, border_style="green"), console=console,
+                      refresh_per_second=10):
+                for start in range(0, len(result_str), 4096):
+                    body.append(result_str[start:start + 4096])
+        finally:
+            self._progress.start()
+
     async def switch_server(self, server_name: str) -> bool:
         """Switch to a different MCP server"""
-        servers = ServerManager().get_available_servers()
+        # Reuse the manager built in __init__ instead of re-reading config
+        servers = self.server_manager.list_servers()
         if server_name not in servers:
             console.print(f"[red]Server '{server_name}' not available[/red]")
             return False
             
         try:
-            # Clean up current client
+            # Overlap old-client teardown with the new client's connect;
+            # both coroutines run on the shared client loop
+            new_client = MCPClient(server_name, force_stdio=self.force_stdio, force_tcp=self.force_tcp)
             if self.client:
-                self.client.stop()
-            
-            # Initialize new client with same force flags
-            self.client = MCPClient(server_name, force_stdio=self.force_stdio, force_tcp=self.force_tcp)
-            await self.client.start()
+                await asyncio.gather(
+                    self._loop_thread.submit(self.client.stop()),
+                    self._loop_thread.submit(new_client.start())
+                )
+            else:
+                await self._loop_thread.submit(new_client.start())
+            self.client = new_client
             self.current_server = server_name
-            
-            # Get and display capabilities
-            caps = await self.get_server_capabilities()
+
+            # Refresh the cached capability set for the new server
+            self._set_capabilities(
+                await self._loop_thread.submit(self.client.get_capabilities())
+            )
+            caps = self._capabilities
             console.print(f"[green]Successfully switched to server: {server_name}[/green]")
             console.print("[cyan]Server capabilities:[/cyan]")
             for cap in caps:
@@ -210,20 +369,27 @@ class AgentClient:
         except Exception as e:
             console.print(f"[red]Error switching to server {server_name}: {str(e)}[/red]")
             # Try to revert to previous server
+            self._set_capabilities(None)
             if self.current_server and self.current_server != server_name:
                 self.client = MCPClient(self.current_server)
-                await self.client.start()
+                await self._loop_thread.submit(self.client.start())
+                self._set_capabilities(
+                    await self._loop_thread.submit(self.client.get_capabilities())
+                )
             return False
         
     def list_available_servers(self) -> List[str]:
         """Get list of available servers"""
         return self.server_manager.list_servers()
         
-    async def get_server_capabilities(self) -> List[str]:
+    async def get_server_capabilities(self) -> Collection[str]:
         """Get capabilities of current server"""
+        # Callers only iterate; return the cached set without copying
+        if self._capabilities is not None:
+            return self._capabilities
         if not self.client:
-            return []
-        return list(await self.client.get_capabilities())
+            return ()
+        return await self._loop_thread.submit(self.client.get_capabilities())
 
     async def show_help(self):
         """Show help message with available commands"""
@@ -234,22 +400,13 @@ class AgentClient:
         console.print("- help: Show this help message")
         console.print("- exit/quit: End the session\n")
 
-        # Get current server capabilities
-        capabilities = await self.client.get_capabilities()
+        # Use the capability set cached at connect time
+        capabilities = self._capabilities or frozenset()
         if capabilities:
             console.print("[bold]Tool Server Commands:[/bold]")
-            if "file_read" in capabilities:
-                console.print("- file_read <path>: Read contents of a file")
-            if "file_write" in capabilities:
-                console.print("- file_write <path> <content>: Write content to a file")
-            if "file_search" in capabilities:
-                console.print("- file_search <pattern>: Search for files matching pattern")
-            if "code_search" in capabilities:
-                console.print("- code_search <query>: Search code contents")
-            if "execute_command" in capabilities:
-                console.print("- execute_command <command>: Execute a shell command")
-            if "check_errors" in capabilities:
-                console.print("- check_errors [file]: Check for errors in file(s)")
+            for cmd in HELP_LINES:
+                if cmd in self._supported_commands:
+                    console.print(HELP_LINES[cmd])
             if "generate" in capabilities:
                 console.print("- <text>: Generate response using AI model")
             console.print("")
@@ -3,6 +3,7 @@ Server Manager for MCP Client
 Handles server discovery, configuration, and management
 """
 
+import copy
 import json
 import os
 from typing import Dict, List, Optional
@@ -13,6 +14,26 @@ import yaml
 
 logger = logging.getLogger(__name__)
 
+# Parsed config files keyed by (path, mtime, size); an unchanged file is
+# served from cache and only re-read after it changes on disk
+_CONFIG_CACHE: Dict[tuple, Dict] = {}
+
+def read_config_cached(path: str) -> Dict:
+    """Load a JSON config file, cached until the file changes on disk"""
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+    cached = _CONFIG_CACHE.get(key)
+    if cached is None:
+        with open(path) as f:
+            cached = json.load(f)
+        # Drop stale entries for this path before caching the new one
+        for old_key in [k for k in _CONFIG_CACHE if k[0] == path]:
+            del _CONFIG_CACHE[old_key]
+        _CONFIG_CACHE[key] = cached
+    # Deep copy so callers that mutate the config (e.g. forced stdio
+    # args) never corrupt the cached document
+    return copy.deepcopy(cached)
+
 @dataclass
 class ServerConfig:
     name: str
@@ -25,22 +46,34 @@ class ServerManager:
     def __init__(self, config_path: str = "server_config.json"):
         self.config_path = config_path
         self.servers: Dict[str, ServerConfig] = {}
+        # Cached name list, rebuilt only when the server set changes
+        self._server_names: Optional[List[str]] = None
+        # Inverted index: capability -> servers providing it
+        self._by_cap: Dict[str, List[ServerConfig]] = {}
         self.load_config()
 
+    def _rebuild_capability_index(self):
+        """Rebuild the capability index from the current server set"""
+        self._by_cap = {}
+        for server in self.servers.values():
+            for capability in server.capabilities:
+                self._by_cap.setdefault(capability, []).append(server)
+
     def load_config(self):
         """Load server configurations"""
         try:
-            with open(self.config_path) as f:
-                config = json.load(f)
-                for name, info in config.get("servers", {}).items():
-                    self.servers[name] = ServerConfig(
-                        name=name,
-                        type=info.get("type", "unknown"),
-                        command=info.get("command", ""),
-                        args=info.get("args", []),
-                        capabilities=info.get("capabilities", [])
-                    )
-                logger.info(f"Loaded {len(self.servers)} server configurations")
+            config = read_config_cached(self.config_path)
+            for name, info in config.get("servers", {}).items():
+                self.servers[name] = ServerConfig(
+                    name=name,
+                    type=info.get("type", "unknown"),
+                    command=info.get("command", ""),
+                    args=info.get("args", []),
+                    capabilities=info.get("capabilities", [])
+                )
+            logger.info(f"Loaded {len(self.servers)} server configurations")
+            self._server_names = None
+            self._rebuild_capability_index()
         except Exception as e:
             logger.error(f"Error loading server config: {str(e)}")
 
@@ -50,14 +83,13 @@ class ServerManager:
 
     def list_servers(self) -> List[str]:
         """List available servers"""
-        return list(self.servers.keys())
+        if self._server_names is None:
+            self._server_names = list(self.servers.keys())
+        return self._server_names
 
     def get_servers_by_capability(self, capability: str) -> List[ServerConfig]:
         """Find servers that support a specific capability"""
-        return [
-            server for server in self.servers.values()
-            if capability in server.capabilities
-        ]
+        return list(self._by_cap.get(capability, ()))
 
     def add_server(self, name: str, config: Dict) -> bool:
         """Add a new server configuration"""
@@ -69,6 +101,8 @@ class ServerManager:
                 args=config.get("args", []),
                 capabilities=config.get("capabilities", [])
             )
+            self._server_names = None
+            self._rebuild_capability_index()
             self._save_config()
             return True
         except Exception as e:
@@ -79,6 +113,8 @@ class ServerManager:
         """Remove a server configuration"""
         if name in self.servers:
             del self.servers[name]
+            self._server_names = None
+            self._rebuild_capability_index()
             self._save_config()
             return True
         return False
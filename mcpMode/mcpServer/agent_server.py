@@ -4,6 +4,7 @@ import sys
 import logging
 from enum import Enum
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import uuid
 from pathlib import Path
@@ -103,6 +104,12 @@ class AgentServer:
 class MCPAgentServer:
     def __init__(self):
         self.agent = AgentServer()
+        # Serializes stdout so interleaved tasks never tear frames apart
+        self._stdout_lock = asyncio.Lock()
+        # Strong references to in-flight request tasks; the loop itself
+        # only keeps weak ones, so an unreferenced task can be collected
+        # mid-execution
+        self._tasks: set = set()
         self.methods = {
             "initialize": self.agent.initialize,
             "handle_task": self.agent.handle_task,
@@ -139,37 +146,76 @@ class MCPAgentServer:
                 }
             }
 
+    async def _write_response(self, response: Any):
+        """Write one response frame to stdout under the lock"""
+        async with self._stdout_lock:
+            sys.stdout.write(json.dumps(response) + '\n')
+            sys.stdout.flush()
+
+    async def _handle_entry(self, request: Any) -> Optional[Dict[str, Any]]:
+        """Handle one request object; notifications produce no reply"""
+        if not isinstance(request, dict):
+            return {
+                'jsonrpc': '2.0',
+                'error': {'code': -32600, 'message': 'Invalid Request'},
+                'id': None
+            }
+        response = await self.handle_request(request)
+        if 'id' not in request:
+            return None
+        response['jsonrpc'] = '2.0'
+        response['id'] = request['id']
+        return response
+
+    async def _dispatch(self, line: str):
+        """Handle a single request line and write its response"""
+        request = {}
+        try:
+            request = json.loads(line)
+            if isinstance(request, list):
+                # JSON-RPC 2.0 batch: independent entries run
+                # concurrently; notification replies are dropped
+                results = await asyncio.gather(
+                    *(self._handle_entry(entry) for entry in request)
+                )
+                results = [r for r in results if r is not None]
+                if results:
+                    await self._write_response(results)
+                return
+
+            response = await self._handle_entry(request)
+            if response is not None:
+                await self._write_response(response)
+
+        except Exception as e:
+            error_response = {
+                'jsonrpc': '2.0',
+                'error': {
+                    'code': -32603,
+                    'message': f'Internal error: {str(e)}'
+                }
+            }
+            if 'id' in request:
+                error_response['id'] = request['id']
+            await self._write_response(error_response)
+
     async def run(self):
-        while True:
-            try:
-                line = sys.stdin.readline()
+        loop = asyncio.get_running_loop()
+        # Blocking stdin reads run on a small worker pool so the event
+        # loop stays free to make progress on dispatched requests
+        reader_pool = ThreadPoolExecutor(max_workers=4)
+        try:
+            while True:
+                line = await loop.run_in_executor(reader_pool, sys.stdin.readline)
                 if not line:
                     break
-                    
-                request = json.loads(line)
-                response = await self.handle_request(request)
-                
-                # Add jsonrpc version and id from request
-                response['jsonrpc'] = '2.0'
-                if 'id' in request:
-                    response['id'] = request['id']
-                
-                # Write response
-                sys.stdout.write(json.dumps(response) + '\n')
-                sys.stdout.flush()
-                
-            except Exception as e:
-                error_response = {
-                    'jsonrpc': '2.0',
-                    'error': {
-                        'code': -32603,
-                        'message': f'Internal error: {str(e)}'
-                    }
-                }
-                if 'id' in request:
-                    error_response['id'] = request['id']
-                sys.stdout.write(json.dumps(error_response) + '\n')
-                sys.stdout.flush()
+                # Each request runs as its own task; a slow handler never
+                # stalls the requests queued behind it
+                task = asyncio.create_task(self._dispatch(line))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        finally:
+            reader_pool.shutdown(wait=False)
 
 if __name__ == "__main__":
     server = MCPAgentServer()
@@ -1,418 +1,581 @@
-from typing import Dict, Any, Optional
-import json
-import sys
-import asyncio
-from asyncio import StreamReader, StreamWriter
-import logging
-
-# Setup logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('mcp_server.log'),
-        logging.StreamHandler()
-    ]
-)
-logger = logging.getLogger(__name__)
-
-class BaseMCPServer:
-    def __init__(self, server_type: str = "base", version: str = "1.0.0", host: str = "localhost", port: int = 8000):
-        self.server_type = server_type
-        self.version = version
-        self.supported_methods = set()
-        self.initialized = False
-        self.host = host
-        self.port = port
-        self.server = None
-        self.initialize()
-        logger.info(f"Initialized {server_type} server version {version}")
-
-    def initialize(self):
-        """Initialize the server and set up supported methods"""
-        self.supported_methods.add("initialize")
-        self.initialized = True
-        logger.info("Server initialized with basic capabilities")
-
-    def can_handle(self, method: str) -> bool:
-        """Check if method is supported"""
-        return method in self.supported_methods
-
-    def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
-        """Handle a JSON-RPC request"""
-        method = request.get('method')
-        params = request.get('params', {})
-        logger.debug(f"Handling request - method: {method}, params: {params}")
-        
-        # Handle initialize request
-        if method == 'initialize':
-            if not self.initialized:
-                self.initialize()
-            response = {
-                'result': {
-                    'capabilities': {
-                        'serverType': self.server_type,
-                        'version': self.version,
-                        'supportedMethods': list(self.supported_methods)
-                    }
-                }
-            }
-            logger.info(f"Initialize response: {response}")
-            return response
-
-        # Check if method is supported
-        if not self.can_handle(method):
-            error = {
-                'error': {
-                    'code': -32601,
-                    'message': f'Method {method} not found or not supported'
-                }
-            }
-            logger.warning(f"Method not supported: {method}")
-            return error
-
-        # Dispatch method to appropriate handler
-        handler = getattr(self, f'handle_{method}', None)
-        if handler:
-            try:
-                result = asyncio.get_event_loop().run_until_complete(handler(params)) if asyncio.iscoroutinefunction(handler) else handler(params)
-                logger.info(f"Method {method} executed successfully")
-                return {'result': result}
-            except Exception as e:
-                logger.error(f"Error executing method {method}: {str(e)}", exc_info=True)
-                return {
-                    'error': {
-                        'code': -32000,
-                        'message': str(e)
-                    }
-                }
-                
-        logger.error(f"Method handler not implemented: {method}")
-        return {
-            'error': {
-                'code': -32601,
-                'message': f'Method handler for {method} not implemented'
-            }
-        }
-
-    async def handle_client(self, reader: StreamReader, writer: StreamWriter):
-        """Handle individual client connection"""
-        peer = writer.get_extra_info('peername')
-        logger.info(f"New client connection from {peer}")
-        request_count = 0
-        
-        try:
-            while True:
-                data = await reader.readline()
-                if not data:
-                    logger.info(f"Client {peer} closed connection (EOF received)")
-                    break
-                    
-                request_count += 1
-                request_str = data.decode().strip()
-                logger.info(f"[{peer}] Request #{request_count} received: {request_str[:200]}{'...' if len(request_str) > 200 else ''}")
-                
-                try:
-                    request = json.loads(request_str)
-                    response = self.handle_request(request)
-                    
-                    # Add jsonrpc version and id if missing
-                    if 'jsonrpc' not in response:
-                        response['jsonrpc'] = '2.0'
-                    if 'id' in request and 'id' not in response:
-                        response['id'] = request['id']
-                    
-                    # Send response
-                    response_str = json.dumps(response) + "\n"
-                    writer.write(response_str.encode())
-                    await writer.drain()
-                    logger.info(f"[{peer}] Response sent: {response_str[:200]}{'...' if len(response_str) > 200 else ''}")
-                    
-                except json.JSONDecodeError as e:
-                    logger.error(f"[{peer}] Invalid JSON in request #{request_count}: {str(e)}")
-                    error_response = {
-                        "jsonrpc": "2.0",
-                        "error": {
-                            "code": -32700,
-                            "message": f"Parse error: {str(e)}"
-                        },
-                        "id": None
-                    }
-                    writer.write((json.dumps(error_response) + "\n").encode())
-                    await writer.drain()
-                    
-        except Exception as e:
-            logger.error(f"[{peer}] Connection error: {str(e)}", exc_info=True)
-        finally:
-            writer.close()
-            await writer.wait_closed()
-            logger.info(f"[{peer}] Connection closed after handling {request_count} requests")
-
-    async def start_server(self):
-        """Start TCP server"""
-        self.server = await asyncio.start_server(
-            self.handle_client,
-            self.host,
-            self.port
-        )
-        
-        addr = self.server.sockets[0].getsockname()
-        logger.info(f'Server listening on {addr}')
-        
-        async with self.server:
-            logger.info("Server ready to accept connections")
-            await self.server.serve_forever()
-
-    async def handle_stdio(self):
-        """Handle stdio communication"""
-        logger.info("Starting stdio handler")
-        
-        # Configure stdio for line buffering
-        if hasattr(sys.stdout, 'reconfigure'):
-            sys.stdout.reconfigure(encoding='utf-8', line_buffering=True)
-        if hasattr(sys.stdin, 'reconfigure'):
-            sys.stdin.reconfigure(encoding='utf-8', line_buffering=True)
-            
-        while True:
-            try:
-                # Read request synchronously
-                line = sys.stdin.readline()
-                if not line:
-                    logger.warning("Received EOF on stdin")
-                    break
-                    
-                line = line.strip()
-                if not line:
-                    continue
-                    
-                try:
-                    request = json.loads(line)
-                    response = self.handle_request(request)
-                    
-                    # Add jsonrpc version and id
-                    response['jsonrpc'] = '2.0'
-                    if 'id' in request:
-                        response['id'] = request['id']
-                    
-                    # Write response
-                    response_str = json.dumps(response) + "\n"
-                    sys.stdout.write(response_str)
-                    sys.stdout.flush()
-                    logger.debug(f"Response sent: {response_str.strip()}")
-                    
-                except json.JSONDecodeError as e:
-                    logger.error(f"Invalid JSON: {str(e)}")
-                    error_response = {
-                        "jsonrpc": "2.0",
-                        "error": {
-                            "code": -32700,
-                            "message": "Parse error"
-                        },
-                        "id": None
-                    }
-                    sys.stdout.write(json.dumps(error_response) + "\n")
-                    sys.stdout.flush()
-                    
-            except Exception as e:
-                logger.error(f"Fatal error in stdio handler: {str(e)}", exc_info=True)
-                error_response = {
-                    "jsonrpc": "2.0",
-                    "error": {
-                        "code": -32099,
-                        "message": f"Server error: {str(e)}"
-                    },
-                    "id": None
-                }
-                try:
-                    sys.stdout.write(json.dumps(error_response) + "\n")
-                    sys.stdout.flush()
-                except:
-                    pass
-                continue
-                
-        logger.warning("Stdio handler loop ended")
-
-    def run(self):
-        """Run the server main loop"""
-        while True:
-            try:
-                line = sys.stdin.readline()
-                if not line:
-                    break
-                    
-                request = json.loads(line)
-                response = self.handle_request(request)
-                
-                # Add jsonrpc version and id from request
-                response['jsonrpc'] = '2.0'
-                if 'id' in request:
-                    response['id'] = request['id']
-                
-                # Write response
-                sys.stdout.write(json.dumps(response) + '\n')
-                sys.stdout.flush()
-                
-            except Exception as e:
-                error_response = {
-                    'jsonrpc': '2.0',
-                    'error': {'code': -32603, 'message': str(e)}
-                }
-                if 'id' in request:
-                    error_response['id'] = request['id']
-                sys.stdout.write(json.dumps(error_response) + '\n')
-                sys.stdout.flush()
-
-class ModelMCPServer(BaseMCPServer):
-    def __init__(self):
-        super().__init__(server_type="model", version="1.0.0")
-        self.model = None
-        self.tokenizer = None
-        logger.info("Initialized ModelMCPServer")
-        
-    def initialize(self):
-        """Initialize model server and set supported methods"""
-        super().initialize()
-        self.supported_methods.add("generate")
-        self.supported_methods.add("model_info")
-        logger.info("Model server initialized with methods: generate, model_info")
-        
-    async def handle_generate(self, params: Dict[str, Any]) -> Dict[str, Any]:
-        """Handle model generation request"""
-        prompt = params.get("ask", "")
-        logger.info(f"Handling generate request with prompt: {prompt[:100]}...")
-        try:
-            # TODO: Replace with actual model generation
-            result = {
-                "answer": f"Model response to: {prompt}"
-            }
-            logger.info("Generate request completed successfully")
-            return result
-        except Exception as e:
-            logger.error(f"Error during generate: {str(e)}", exc_info=True)
-            raise
-        
-    async def handle_model_info(self, params: Dict[str, Any]) -> Dict[str, Any]:
-        """Return model information"""
-        logger.info("Handling model_info request")
-        try:
-            info = {
-                "modelType": "example-model",
-                "capabilities": ["text-generation", "chat"]
-            }
-            logger.info(f"Model info: {info}")
-            return info
-        except Exception as e:
-            logger.error(f"Error getting model info: {str(e)}", exc_info=True)
-            raise
-
-class TaskMCPServer(BaseMCPServer):
-    def __init__(self):
-        super().__init__(server_type="task", version="1.0.0")
-        self.current_task = None
-        logger.info("Initialized TaskMCPServer")
-        
-    def initialize(self):
-        """Initialize task server and set supported methods"""
-        super().initialize()
-        self.supported_methods.add("handle_task")
-        self.supported_methods.add("get_state")
-        self.supported_methods.add("monitor_environment")
-        logger.info("Task server initialized with methods: handle_task, get_state, monitor_environment")
-        
-    async def handle_task(self, params: Dict[str, Any]) -> Dict[str, Any]:
-        """Handle task execution request"""
-        goal = params.get("goal", "")
-        logger.info(f"Handling task request with goal: {goal}")
-        try:
-            # TODO: Replace with actual task handling
-            self.current_task = goal
-            result = {
-                "status": "success",
-                "result": f"Completed task: {goal}"
-            }
-            logger.info(f"Task completed successfully: {goal}")
-            return result
-        except Exception as e:
-            logger.error(f"Error executing task: {str(e)}", exc_info=True)
-            raise
-        
-    async def handle_get_state(self, params: Dict[str, Any]) -> Dict[str, Any]:
-        """Get current server state"""
-        logger.info("Getting current server state")
-        try:
-            state = {
-                "status": "running",
-                "activeTask": self.current_task
-            }
-            logger.debug(f"Current state: {state}")
-            return state
-        except Exception as e:
-            logger.error(f"Error getting state: {str(e)}", exc_info=True)
-            raise
-        
-    async def handle_monitor_environment(self, params: Dict[str, Any]) -> Dict[str, Any]:
-        """Monitor environment state"""
-        logger.info("Monitoring environment")
-        try:
-            status = {
-                "status": "monitoring",
-                "events": []
-            }
-            logger.debug(f"Environment status: {status}")
-            return status
-        except Exception as e:
-            logger.error(f"Error monitoring environment: {str(e)}", exc_info=True)
-            raise
-
-# Example usage
-if __name__ == "__main__":
-    import argparse
-    import platform
-    
-    # Set Windows event loop policy to use ProactorEventLoop
-    if platform.system() == 'Windows':
-        asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
-    
-    parser = argparse.ArgumentParser(description='MCP Server')
-    parser.add_argument('--host', default='localhost', help='Host address to bind to')
-    parser.add_argument('--port', type=int, default=8000, help='Port to listen on')
-    parser.add_argument('--type', choices=['base', 'model', 'task'], default='base', help='Server type')
-    parser.add_argument('--stdio', action='store_true', help='Use stdio mode instead of TCP')
-    args = parser.parse_args()
-    
-    logger.info(f"Starting {args.type} server")
-    logger.info(f"Platform: {platform.system()} {platform.release()}")
-    logger.info(f"Python version: {sys.version}")
-    logger.info(f"Mode: {'stdio' if args.stdio else 'TCP'}")
-    
-    # Create appropriate server instance based on type
-    if args.type == 'model':
-        server = ModelMCPServer()
-    elif args.type == 'task':
-        server = TaskMCPServer()
-    else:
-        server = BaseMCPServer()
-    
-    server.host = args.host
-    server.port = args.port
-    
-    # Create and set event loop
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    
-    # Run server based on mode
-    try:
-        if args.stdio:
-            logger.info("Starting server in stdio mode")
-            loop.run_until_complete(server.handle_stdio())
-        else:
-            logger.info(f"Starting server in TCP mode on {args.host}:{args.port}")
-            loop.run_until_complete(server.start_server())
-    except KeyboardInterrupt:
-        logger.info("Server shutting down due to keyboard interrupt")
-    except Exception as e:
-        logger.error(f"Server error: {str(e)}", exc_info=True)
-        sys.exit(1)
-    finally:
-        loop.close()
-        logger.info("Server shutdown complete")
+from typing import Dict, Any, Optional
+import json
+import sys
+import asyncio
+from asyncio import StreamReader, StreamWriter
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+# Setup logging: handlers run on a background listener thread, so a log
+# call on the request path is just a queue put, never a disk write
+_log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+_file_handler = logging.FileHandler('mcp_server.log')
+_file_handler.setFormatter(_log_formatter)
+_console_handler = logging.StreamHandler()
+_console_handler.setLevel(logging.WARNING)
+_console_handler.setFormatter(_log_formatter)
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_log_listener = QueueListener(_log_queue, _file_handler, _console_handler,
+                              respect_handler_level=True)
+_log_listener.start()
+logging.basicConfig(level=logging.INFO, handlers=[QueueHandler(_log_queue)])
+logger = logging.getLogger(__name__)
+
+# orjson's C parser/serializer for the request loops when available
+try:
+    import orjson
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj).encode('utf-8')
+    _loads = json.loads
+
+# Canonical parse-error reply, serialized once at import time
+_PARSE_ERROR_BODY = _dumps({
+    "jsonrpc": "2.0",
+    "error": {"code": -32700, "message": "Parse error"},
+    "id": None
+})
+_PARSE_ERROR = _PARSE_ERROR_BODY + b"\n"
+
+class BaseMCPServer:
+    def __init__(self, server_type: str = "base", version: str = "1.0.0", host: str = "localhost", port: int = 8000):
+        self.server_type = server_type
+        self.version = version
+        self.supported_methods = set()
+        self.initialized = False
+        self.host = host
+        self.port = port
+        self.server = None
+        # Content-Length framing instead of newline-delimited frames
+        self.framed = False
+        self.initialize()
+        logger.info(f"Initialized {server_type} server version {version}")
+
+    def initialize(self):
+        """Initialize the server and set up supported methods"""
+        self.supported_methods.add("initialize")
+        self.initialized = True
+        self._rebuild_dispatch()
+        logger.info("Server initialized with basic capabilities")
+
+    def _rebuild_dispatch(self):
+        """Precompute handler lookup and coroutine-ness per method"""
+        self._dispatch_table = {
+            method: getattr(self, f'handle_{method}')
+            for method in self.supported_methods
+            if hasattr(self, f'handle_{method}')
+        }
+        self._async_methods = frozenset(
+            name for name, fn in self._dispatch_table.items()
+            if asyncio.iscoroutinefunction(fn)
+        )
+
+    def can_handle(self, method: str) -> bool:
+        """Check if method is supported"""
+        return method in self.supported_methods
+
+    async def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Handle a JSON-RPC request"""
+        method = request.get('method')
+        params = request.get('params', {})
+        # Lazy %-style: arguments are only formatted on enabled handlers
+        logger.debug("Handling request - method: %s, params: %s", method, params)
+        
+        # Handle initialize request
+        if method == 'initialize':
+            if not self.initialized:
+                self.initialize()
+            response = {
+                'result': {
+                    'capabilities': {
+                        'serverType': self.server_type,
+                        'version': self.version,
+                        'supportedMethods': list(self.supported_methods)
+                    }
+                }
+            }
+            logger.info("Initialize response: %s", response)
+            return response
+
+        # Check if method is supported
+        if not self.can_handle(method):
+            error = {
+                'error': {
+                    'code': -32601,
+                    'message': f'Method {method} not found or not supported'
+                }
+            }
+            logger.warning("Method not supported: %s", method)
+            return error
+
+        # Dispatch through the table built at initialize time; no
+        # per-request getattr or coroutine inspection
+        handler = self._dispatch_table.get(method)
+        if handler:
+            try:
+                if method in self._async_methods:
+                    result = await handler(params)
+                else:
+                    result = handler(params)
+                logger.info("Method %s executed successfully", method)
+                return {'result': result}
+            except Exception as e:
+                logger.error("Error executing method %s: %s", method, e, exc_info=True)
+                return {
+                    'error': {
+                        'code': -32000,
+                        'message': str(e)
+                    }
+                }
+                
+        logger.error("Method handler not implemented: %s", method)
+        return {
+            'error': {
+                'code': -32601,
+                'message': f'Method handler for {method} not implemented'
+            }
+        }
+
+    async def _dispatch(self, request: Any) -> Optional[Dict[str, Any]]:
+        """Handle one batch entry; notifications produce no reply"""
+        if not isinstance(request, dict):
+            return {
+                'jsonrpc': '2.0',
+                'error': {'code': -32600, 'message': 'Invalid Request'},
+                'id': None
+            }
+        response = await self.handle_request(request)
+        if 'id' not in request:
+            return None
+        if 'jsonrpc' not in response:
+            response['jsonrpc'] = '2.0'
+        if 'id' not in response:
+            response['id'] = request['id']
+        return response
+
+    async def handle_client(self, reader: StreamReader, writer: StreamWriter):
+        """Handle individual client connection"""
+        peer = writer.get_extra_info('peername')
+        logger.info("New client connection from %s", peer)
+        request_count = 0
+        
+        buf = bytearray()
+        try:
+            while True:
+                chunk = await reader.read(65536)
+                if not chunk:
+                    logger.info("Client %s closed connection (EOF received)", peer)
+                    break
+
+                # Split out every complete line already buffered; the
+                # whole pipelined burst is answered with one writelines
+                # and one drain, no peeking at stream internals
+                buf += chunk
+                lines = []
+                while (nl := buf.find(b'\n')) != -1:
+                    lines.append(bytes(buf[:nl]))
+                    del buf[:nl + 1]
+                if not lines:
+                    continue
+
+                out = []
+                for data in lines:
+                    # Both codecs consume bytes; only decode for the log
+                    # line, and only when INFO is actually emitted
+                    raw = data.strip()
+                    if not raw:
+                        continue
+                    request_count += 1
+                    if logger.isEnabledFor(logging.INFO):
+                        logger.info("[%s] Request #%d received: %s%s", peer, request_count,
+                                    raw[:200].decode(errors='replace'), '...' if len(raw) > 200 else '')
+
+                    try:
+                        request = _loads(raw)
+                        if isinstance(request, list):
+                            # JSON-RPC 2.0 batch: independent entries run
+                            # concurrently; notification replies are dropped
+                            results = await asyncio.gather(
+                                *(self._dispatch(entry) for entry in request)
+                            )
+                            results = [r for r in results if r is not None]
+                            if not results:
+                                continue
+                            response_bytes = _dumps(results) + b"\n"
+                        else:
+                            response = await self.handle_request(request)
+
+                            # Add jsonrpc version and id if missing
+                            if 'jsonrpc' not in response:
+                                response['jsonrpc'] = '2.0'
+                            if 'id' in request and 'id' not in response:
+                                response['id'] = request['id']
+
+                            # Send response as bytes straight from the serializer
+                            response_bytes = _dumps(response) + b"\n"
+                        out.append(response_bytes)
+                        if logger.isEnabledFor(logging.INFO):
+                            logger.info("[%s] Response sent: %s%s", peer, response_bytes[:200],
+                                        b'...' if len(response_bytes) > 200 else b'')
+
+                    except ValueError as e:
+                        logger.error("[%s] Invalid JSON in request #%d: %s", peer, request_count, e)
+                        # Constant reply; the parse detail stays in the log
+                        out.append(_PARSE_ERROR)
+
+                if out:
+                    writer.writelines(out)
+                    await writer.drain()
+
+        except Exception as e:
+            logger.error("[%s] Connection error: %s", peer, e, exc_info=True)
+        finally:
+            writer.close()
+            await writer.wait_closed()
+            logger.info("[%s] Connection closed after handling %d requests", peer, request_count)
+
+    async def _read_frame(self, reader: StreamReader) -> Optional[bytes]:
+        """Read one Content-Length framed payload; None on EOF"""
+        length = None
+        while True:
+            line = await reader.readline()
+            if not line:
+                return None
+            line = line.strip()
+            if not line:
+                break  # blank line ends the header block
+            if line.lower().startswith(b'content-length:'):
+                length = int(line.split(b':', 1)[1])
+        if length is None:
+            raise ValueError("Missing Content-Length header")
+        return await reader.readexactly(length)
+
+    async def handle_framed_client(self, reader: StreamReader, writer: StreamWriter):
+        """Handle a client using LSP-style Content-Length framing"""
+        peer = writer.get_extra_info('peername')
+        logger.info("New framed client connection from %s", peer)
+        request_count = 0
+
+        try:
+            while True:
+                try:
+                    payload = await self._read_frame(reader)
+                except asyncio.IncompleteReadError:
+                    break
+                if payload is None:
+                    logger.info("Client %s closed connection (EOF received)", peer)
+                    break
+
+                request_count += 1
+                try:
+                    request = _loads(payload)
+                    if isinstance(request, list):
+                        results = await asyncio.gather(
+                            *(self._dispatch(entry) for entry in request)
+                        )
+                        results = [r for r in results if r is not None]
+                        if not results:
+                            continue
+                        body = _dumps(results)
+                    else:
+                        response = await self._dispatch(request)
+                        if response is None:
+                            continue
+                        body = _dumps(response)
+                except ValueError as e:
+                    logger.error("[%s] Invalid JSON in framed request #%d: %s", peer, request_count, e)
+                    body = _PARSE_ERROR_BODY
+
+                writer.write(b'Content-Length: ' + str(len(body)).encode() + b'\r\n\r\n' + body)
+                # Below the high-water mark drain returns immediately,
+                # so this only waits when the client is actually slow
+                await writer.drain()
+
+        except Exception as e:
+            logger.error("[%s] Connection error: %s", peer, e, exc_info=True)
+        finally:
+            writer.close()
+            await writer.wait_closed()
+            logger.info("[%s] Connection closed after handling %d requests", peer, request_count)
+
+    async def start_server(self):
+        """Start TCP server"""
+        self.server = await asyncio.start_server(
+            self.handle_framed_client if self.framed else self.handle_client,
+            self.host,
+            self.port
+        )
+        
+        addr = self.server.sockets[0].getsockname()
+        logger.info(f'Server listening on {addr}')
+        
+        async with self.server:
+            logger.info("Server ready to accept connections")
+            await self.server.serve_forever()
+
+    async def handle_stdio(self):
+        """Handle stdio communication"""
+        logger.info("Starting stdio handler")
+        
+        # Configure stdio for line buffering
+        if hasattr(sys.stdout, 'reconfigure'):
+            sys.stdout.reconfigure(encoding='utf-8', line_buffering=True)
+        if hasattr(sys.stdin, 'reconfigure'):
+            sys.stdin.reconfigure(encoding='utf-8', line_buffering=True)
+            
+        while True:
+            try:
+                # Read request synchronously
+                line = sys.stdin.readline()
+                if not line:
+                    logger.warning("Received EOF on stdin")
+                    break
+                    
+                line = line.strip()
+                if not line:
+                    continue
+                    
+                try:
+                    request = _loads(line)
+                    response = await self.handle_request(request)
+
+                    # Add jsonrpc version and id
+                    response['jsonrpc'] = '2.0'
+                    if 'id' in request:
+                        response['id'] = request['id']
+
+                    # Write response bytes straight from the serializer
+                    response_bytes = _dumps(response) + b"\n"
+                    sys.stdout.buffer.write(response_bytes)
+                    sys.stdout.flush()
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Response sent: %s", response_bytes.strip())
+
+                except ValueError as e:
+                    logger.error("Invalid JSON: %s", e)
+                    sys.stdout.buffer.write(_PARSE_ERROR)
+                    sys.stdout.flush()
+                    
+            except Exception as e:
+                logger.error(f"Fatal error in stdio handler: {str(e)}", exc_info=True)
+                error_response = {
+                    "jsonrpc": "2.0",
+                    "error": {
+                        "code": -32099,
+                        "message": f"Server error: {str(e)}"
+                    },
+                    "id": None
+                }
+                try:
+                    sys.stdout.buffer.write(_dumps(error_response) + b"\n")
+                    sys.stdout.flush()
+                except:
+                    pass
+                continue
+                
+        logger.warning("Stdio handler loop ended")
+
+    async def run(self):
+        """Run the server main loop"""
+        while True:
+            try:
+                line = sys.stdin.readline()
+                if not line:
+                    break
+
+                request = _loads(line)
+                response = await self.handle_request(request)
+
+                # Add jsonrpc version and id from request
+                response['jsonrpc'] = '2.0'
+                if 'id' in request:
+                    response['id'] = request['id']
+
+                # Write response
+                sys.stdout.buffer.write(_dumps(response) + b'\n')
+                sys.stdout.flush()
+
+            except Exception as e:
+                error_response = {
+                    'jsonrpc': '2.0',
+                    'error': {'code': -32603, 'message': str(e)}
+                }
+                if 'id' in request:
+                    error_response['id'] = request['id']
+                sys.stdout.buffer.write(_dumps(error_response) + b'\n')
+                sys.stdout.flush()
+
+class ModelMCPServer(BaseMCPServer):
+    def __init__(self):
+        super().__init__(server_type="model", version="1.0.0")
+        self.model = None
+        self.tokenizer = None
+        logger.info("Initialized ModelMCPServer")
+        
+    def initialize(self):
+        """Initialize model server and set supported methods"""
+        super().initialize()
+        self.supported_methods.add("generate")
+        self.supported_methods.add("model_info")
+        self._rebuild_dispatch()
+        logger.info("Model server initialized with methods: generate, model_info")
+        
+    async def handle_generate(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Handle model generation request"""
+        prompt = params.get("ask", "")
+        logger.info("Handling generate request with prompt: %.100s...", prompt)
+        try:
+            # TODO: Replace with actual model generation
+            result = {
+                "answer": f"Model response to: {prompt}"
+            }
+            logger.info("Generate request completed successfully")
+            return result
+        except Exception as e:
+            logger.error("Error during generate: %s", e, exc_info=True)
+            raise
+        
+    async def handle_model_info(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Return model information"""
+        logger.info("Handling model_info request")
+        try:
+            info = {
+                "modelType": "example-model",
+                "capabilities": ["text-generation", "chat"]
+            }
+            logger.info("Model info: %s", info)
+            return info
+        except Exception as e:
+            logger.error("Error getting model info: %s", e, exc_info=True)
+            raise
+
+class TaskMCPServer(BaseMCPServer):
+    def __init__(self):
+        super().__init__(server_type="task", version="1.0.0")
+        self.current_task = None
+        logger.info("Initialized TaskMCPServer")
+        
+    def initialize(self):
+        """Initialize task server and set supported methods"""
+        super().initialize()
+        self.supported_methods.add("handle_task")
+        self.supported_methods.add("get_state")
+        self.supported_methods.add("monitor_environment")
+        self._rebuild_dispatch()
+        logger.info("Task server initialized with methods: handle_task, get_state, monitor_environment")
+        
+    async def handle_task(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Handle task execution request"""
+        goal = params.get("goal", "")
+        logger.info("Handling task request with goal: %s", goal)
+        try:
+            # TODO: Replace with actual task handling
+            self.current_task = goal
+            result = {
+                "status": "success",
+                "result": f"Completed task: {goal}"
+            }
+            logger.info("Task completed successfully: %s", goal)
+            return result
+        except Exception as e:
+            logger.error("Error executing task: %s", e, exc_info=True)
+            raise
+        
+    async def handle_get_state(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Get current server state"""
+        logger.info("Getting current server state")
+        try:
+            state = {
+                "status": "running",
+                "activeTask": self.current_task
+            }
+            logger.debug("Current state: %s", state)
+            return state
+        except Exception as e:
+            logger.error("Error getting state: %s", e, exc_info=True)
+            raise
+        
+    async def handle_monitor_environment(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Monitor environment state"""
+        logger.info("Monitoring environment")
+        try:
+            status = {
+                "status": "monitoring",
+                "events": []
+            }
+            logger.debug("Environment status: %s", status)
+            return status
+        except Exception as e:
+            logger.error("Error monitoring environment: %s", e, exc_info=True)
+            raise
+
+# Example usage
+if __name__ == "__main__":
+    import argparse
+    import platform
+    
+    # Set Windows event loop policy to use ProactorEventLoop
+    if platform.system() == 'Windows':
+        asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+    else:
+        # uvloop's libuv-backed loop is a drop-in replacement that
+        # roughly doubles asyncio networking throughput
+        try:
+            import uvloop
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        except ImportError:
+            pass
+
+    parser = argparse.ArgumentParser(description='MCP Server')
+    parser.add_argument('--host', default='localhost', help='Host address to bind to')
+    parser.add_argument('--port', type=int, default=8000, help='Port to listen on')
+    parser.add_argument('--type', choices=['base', 'model', 'task'], default='base', help='Server type')
+    parser.add_argument('--stdio', action='store_true', help='Use stdio mode instead of TCP')
+    parser.add_argument('--framed', action='store_true',
+                        help='Use Content-Length framing instead of newline-delimited JSON (TCP only)')
+    parser.add_argument('--verbose', action='store_true', help='Enable DEBUG logging')
+    args = parser.parse_args()
+
+    if args.verbose:
+        logging.getLogger().setLevel(logging.DEBUG)
+    
+    logger.info(f"Starting {args.type} server")
+    logger.info(f"Platform: {platform.system()} {platform.release()}")
+    logger.info(f"Python version: {sys.version}")
+    logger.info(f"Mode: {'stdio' if args.stdio else 'TCP'}")
+    
+    # Create appropriate server instance based on type
+    if args.type == 'model':
+        server = ModelMCPServer()
+    elif args.type == 'task':
+        server = TaskMCPServer()
+    else:
+        server = BaseMCPServer()
+    
+    server.host = args.host
+    server.port = args.port
+    server.framed = args.framed
+    
+    # Create and set event loop
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    
+    # Run server based on mode
+    try:
+        if args.stdio:
+            logger.info("Starting server in stdio mode")
+            loop.run_until_complete(server.handle_stdio())
+        else:
+            logger.info(f"Starting server in TCP mode on {args.host}:{args.port}")
+            loop.run_until_complete(server.start_server())
+    except KeyboardInterrupt:
+        logger.info("Server shutting down due to keyboard interrupt")
+    except Exception as e:
+        logger.error(f"Server error: {str(e)}", exc_info=True)
+        sys.exit(1)
+    finally:
+        loop.close()
+        logger.info("Server shutdown complete")
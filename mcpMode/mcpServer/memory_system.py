@@ -4,18 +4,31 @@ Handles working memory, long-term memory, and context management
 """
 
 from typing import Dict, List, Any
+from collections import deque
 from datetime import datetime
+from itertools import islice
 import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Serialize snapshots with orjson when available; stdlib otherwise
+try:
+    import orjson
+    def _dump_state(state: Dict) -> bytes:
+        return orjson.dumps(state, option=orjson.OPT_INDENT_2)
+except ImportError:
+    def _dump_state(state: Dict) -> bytes:
+        return json.dumps(state, indent=2).encode('utf-8')
+
 class MemorySystem:
     def __init__(self):
         self.working_memory: Dict = {}
         self.long_term_memory: List[Dict] = []
-        self.context_window: List[Dict] = []
         self.max_context_size = 50
+        # Bounded deque evicts the oldest entry in O(1); a list's pop(0)
+        # shifted the whole window on every overflow
+        self.context_window: deque = deque(maxlen=self.max_context_size)
         
     def add_to_working_memory(self, key: str, value: object):
         """Add item to working memory"""
@@ -30,14 +43,13 @@ class MemorySystem:
         
     def update_context(self, item: Dict):
         """Update context window"""
+        # maxlen drops the oldest entry automatically
         self.context_window.append(item)
-        if len(self.context_window) > self.max_context_size:
-            self.context_window.pop(0)
-            
+
     def get_relevant_context(self, query: str) -> List[Dict]:
         """Get context relevant to query"""
         # In the future, implement more sophisticated relevance scoring
-        return self.context_window[-10:]
+        return list(islice(self.context_window, max(0, len(self.context_window) - 10), None))
         
     def save_state(self, filename: str = "memory_state.json"):
         """Save memory state"""
@@ -45,10 +57,12 @@ class MemorySystem:
             state = {
                 "working_memory": self.working_memory,
                 "long_term_memory": self.long_term_memory,
-                "context_window": self.context_window
+                "context_window": list(self.context_window)
             }
-            with open(filename, 'w') as f:
-                json.dump(state, f, indent=2)
+            # One serialize to bytes, one write; json.dump's chunked
+            # text writes were the slowest path for large histories
+            with open(filename, 'wb') as f:
+                f.write(_dump_state(state))
         except Exception as e:
             logger.error(f"Error saving memory state: {str(e)}")
             
@@ -59,6 +73,7 @@ class MemorySystem:
                 state = json.load(f)
                 self.working_memory = state.get("working_memory", {})
                 self.long_term_memory = state.get("long_term_memory", [])
-                self.context_window = state.get("context_window", [])
+                self.context_window = deque(state.get("context_window", []),
+                                            maxlen=self.max_context_size)
         except Exception as e:
             logger.error(f"Error loading memory state: {str(e)}")
@@ -3,11 +3,14 @@ Model Manager Implementation for MCP Server
 Handles model execution and management using JSON-RPC 2.0 protocol
 """
 
+import itertools
 import logging
+import threading
+import time
+from collections import deque
 from typing import Dict, Any, Optional
-from datetime import datetime
 import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer
+from transformers import AutoModelForCausalLM, AutoTokenizer, TextIteratorStreamer
 import os
 
 # Set HuggingFace mirror if needed
@@ -21,8 +24,13 @@ class ModelManager:
         self.device = "cuda" if torch.cuda.is_available() and device == "auto" else "cpu"
         self.model = None
         self.tokenizer = None
-        self.execution_history = []
+        # Bounded history of slim records; unbounded dicts holding full
+        # prompts grew without limit on long-running servers
+        self.execution_history: deque = deque(maxlen=10_000)
         self.max_length = 2048
+        # Monotonic ids: no datetime allocation per request, no clock
+        # collisions under load
+        self._next_id = itertools.count(1).__next__
         
         # Initialize the model
         if not self.setup_model():
@@ -38,14 +46,29 @@ class ModelManager:
                 self.model_name,
                 trust_remote_code=True
             )
-            
+
+            # Chat-template halves tokenized once; per-request prompts
+            # are spliced between them as token ids
+            self._user_ids = self.tokenizer("<|user|>\n", return_tensors="pt")["input_ids"]
+            self._asst_ids = self.tokenizer("\n<|assistant|>\n", return_tensors="pt",
+                                            add_special_tokens=False)["input_ids"]
+
+            # Half-precision weights on GPU: inference is memory-bound,
+            # so bf16/fp16 halves both VRAM and bandwidth per token
+            if self.device == "cuda":
+                dtype = torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+            else:
+                dtype = None
+
             # Load model
             self.model = AutoModelForCausalLM.from_pretrained(
                 self.model_name,
                 device_map="auto",
+                torch_dtype=dtype,
                 trust_remote_code=True
             )
-            
+            self.model.eval()
+
             return True
             
         except Exception as e:
@@ -60,7 +83,7 @@ class ModelManager:
                 "jsonrpc": "2.0",
                 "method": method,
                 "params": params,
-                "id": datetime.now().timestamp()
+                "id": self._next_id()
             }
             
             # Generate response
@@ -69,8 +92,9 @@ class ModelManager:
             
             if response:
                 self.execution_history.append({
-                    "request": request,
-                    "timestamp": datetime.now().isoformat(),
+                    "method": method,
+                    "id": request["id"],
+                    "timestamp": time.time_ns(),
                     "success": True
                 })
                 
@@ -82,8 +106,9 @@ class ModelManager:
                 }
             
             self.execution_history.append({
-                "request": request,
-                "timestamp": datetime.now().isoformat(),
+                "method": method,
+                "id": request["id"],
+                "timestamp": time.time_ns(),
                 "success": False
             })
             
@@ -113,33 +138,116 @@ class ModelManager:
         if not self.model or not self.tokenizer:
             raise RuntimeError("Model not initialized")
             
-        try:            
-            # Format prompt for chat format
-            formatted_prompt = f"<|user|>\n{prompt}\n<|assistant|>\n"
-            
-            # Tokenize input
-            inputs = self.tokenizer(formatted_prompt, return_tensors="pt").to(self.device)
-            
-            # Generate response
-            outputs = self.model.generate(
-                **inputs,
-                max_new_tokens=self.max_length,
-                do_sample=True,
-                temperature=0.7,
-                top_p=0.9,
-                top_k=50,
-                repetition_penalty=1.2,
-                pad_token_id=self.tokenizer.eos_token_id
-            )
-            
-            # Decode and clean up response
-            response = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-            return response.replace(formatted_prompt, "").strip()
+        try:
+            # Tokenize only the prompt and splice it between the
+            # pre-tokenized template halves
+            prompt_ids = self.tokenizer(prompt, return_tensors="pt",
+                                        add_special_tokens=False)["input_ids"]
+            input_ids = torch.cat([self._user_ids, prompt_ids, self._asst_ids], dim=1).to(self.device)
+            input_len = input_ids.shape[1]
+
+            # Generate response; inference_mode skips autograd
+            # bookkeeping entirely during the decode loop
+            with torch.inference_mode():
+                outputs = self.model.generate(
+                    input_ids=input_ids,
+                    attention_mask=torch.ones_like(input_ids),
+                    max_new_tokens=self.max_length,
+                    do_sample=True,
+                    temperature=0.7,
+                    top_p=0.9,
+                    top_k=50,
+                    repetition_penalty=1.2,
+                    pad_token_id=self.tokenizer.eos_token_id
+                )
+
+            # Decode only the newly generated tokens; no prefix scan
+            return self.tokenizer.decode(outputs[0][input_len:], skip_special_tokens=True).strip()
             
         except Exception as e:
             logger.error(f"Error generating response: {str(e)}")
             return None
             
+    def generate_response_batch(self, prompts: list) -> list:
+        """Generate responses for several prompts in one model call"""
+        if not self.model or not self.tokenizer:
+            raise RuntimeError("Model not initialized")
+
+        try:
+            texts = [f"<|user|>\n{p}\n<|assistant|>\n" for p in prompts]
+            if self.tokenizer.pad_token is None:
+                self.tokenizer.pad_token = self.tokenizer.eos_token
+
+            # Left padding lines all prompts up to the same length, so
+            # one slice strips the inputs from every row
+            prev_side = self.tokenizer.padding_side
+            self.tokenizer.padding_side = 'left'
+            try:
+                inputs = self.tokenizer(
+                    texts, return_tensors="pt", padding=True,
+                    truncation=True, max_length=self.max_length
+                ).to(self.device)
+            finally:
+                self.tokenizer.padding_side = prev_side
+
+            input_len = inputs["input_ids"].shape[1]
+            with torch.inference_mode():
+                outputs = self.model.generate(
+                    input_ids=inputs["input_ids"],
+                    attention_mask=inputs["attention_mask"],
+                    max_new_tokens=self.max_length,
+                    do_sample=True,
+                    temperature=0.7,
+                    top_p=0.9,
+                    top_k=50,
+                    repetition_penalty=1.2,
+                    pad_token_id=self.tokenizer.eos_token_id
+                )
+
+            return [
+                self.tokenizer.decode(output[input_len:], skip_special_tokens=True).strip()
+                for output in outputs
+            ]
+
+        except Exception as e:
+            logger.error(f"Error generating batch response: {str(e)}")
+            return [None] * len(prompts)
+
+    def generate_response_stream(self, prompt: str):
+        """Yield response text incrementally as tokens are generated"""
+        if not self.model or not self.tokenizer:
+            raise RuntimeError("Model not initialized")
+
+        prompt_ids = self.tokenizer(prompt, return_tensors="pt",
+                                    add_special_tokens=False)["input_ids"]
+        input_ids = torch.cat([self._user_ids, prompt_ids, self._asst_ids], dim=1).to(self.device)
+
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True,
+                                        skip_special_tokens=True)
+
+        def _generate():
+            try:
+                with torch.inference_mode():
+                    self.model.generate(
+                        input_ids=input_ids,
+                        attention_mask=torch.ones_like(input_ids),
+                        max_new_tokens=self.max_length,
+                        do_sample=True,
+                        temperature=0.7,
+                        top_p=0.9,
+                        top_k=50,
+                        repetition_penalty=1.2,
+                        pad_token_id=self.tokenizer.eos_token_id,
+                        streamer=streamer
+                    )
+            except Exception as e:
+                logger.error(f"Error generating streamed response: {str(e)}")
+
+        # generate() blocks until done, so it runs on its own thread
+        # while the streamer hands finished text to the consumer
+        threading.Thread(target=_generate, daemon=True).start()
+        yield from streamer
+
     def cleanup(self):
         """Clean up model resources"""
         try:
@@ -167,5 +275,5 @@ class ModelManager:
                     }
                 }
             },
-            "id": datetime.now().timestamp()
+            "id": self._next_id()
         }
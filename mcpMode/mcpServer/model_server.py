@@ -3,9 +3,13 @@ Model Server Implementation for MCP
 Provides a JSON-RPC 2.0 interface for model operations
 """
 
+import asyncio
 import sys
 import json
 import logging
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any
 from model_manager import ModelManager
 
@@ -17,10 +21,34 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Fast C JSON codec for the request loop, with a stdlib fallback
+try:
+    import orjson
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj).encode('utf-8')
+    _loads = json.loads
+
 class ModelServer:
     def __init__(self):
         self.model_manager = None
         self.initialized = False
+        # One worker: generation must not run concurrently on a single
+        # model, but it must also never block the event loop
+        self._gpu_executor = ThreadPoolExecutor(max_workers=1)
+        # TTL LRU over generate responses, same shape as the client cache
+        self._gen_cache: OrderedDict = OrderedDict()
+        self._gen_cache_max = 1024
+        self._gen_cache_ttl = 300.0
+        self._model_info = None
+        # Micro-batcher: concurrent prompts are coalesced into one
+        # batched model call instead of N batch-size-1 runs
+        self._batch_queue: asyncio.Queue = None
+        self._batch_task: asyncio.Task = None
+        self._max_batch = 8
+        self._batch_window = 0.005
         self.methods = {
             "initialize": self.initialize,
             "generate": self.generate,
@@ -32,6 +60,8 @@ class ModelServer:
         try:
             self.model_manager = ModelManager()
             self.initialized = True
+            self._batch_queue = asyncio.Queue()
+            self._batch_task = asyncio.create_task(self._batch_worker())
             return {
                 "capabilities": {
                     "supportedMethods": ["generate", "model_info"],
@@ -55,36 +85,104 @@ class ModelServer:
             prompt = params.get("ask", "")
             if not prompt:
                 return {"error": "No prompt provided"}
-                
-            # Generate response using the model
-            inputs = self.model_manager.tokenizer(prompt, return_tensors="pt").to(self.model_manager.device)
-            outputs = self.model_manager.model.generate(
-                inputs["input_ids"],
-                max_length=self.model_manager.max_length,
-                temperature=0.7,
-                do_sample=True
-            )
-            response = self.model_manager.tokenizer.decode(outputs[0], skip_special_tokens=True)
-            
-            return {
+
+            # Serve repeated prompts from cache, unless the caller asked
+            # for sampling and so expects a fresh answer each time
+            cache_key = None
+            if not params.get("do_sample"):
+                cache_key = json.dumps(params, sort_keys=True)
+                entry = self._gen_cache.get(cache_key)
+                if entry is not None:
+                    timestamp, cached = entry
+                    if time.monotonic() - timestamp < self._gen_cache_ttl:
+                        self._gen_cache.move_to_end(cache_key)
+                        return cached
+                    del self._gen_cache[cache_key]
+
+            # Queue the prompt for the micro-batcher and wait for our
+            # slot of the batched result
+            future = asyncio.get_running_loop().create_future()
+            await self._batch_queue.put((prompt, future))
+            response = await future
+
+            result = {
                 "answer": response,
                 "model": self.model_manager.model_name
             }
-            
+            if cache_key is not None:
+                self._gen_cache[cache_key] = (time.monotonic(), result)
+                if len(self._gen_cache) > self._gen_cache_max:
+                    self._gen_cache.popitem(last=False)
+            return result
+
         except Exception as e:
             logger.error(f"Generation failed: {str(e)}")
             return {"error": str(e)}
 
+    async def _batch_worker(self):
+        """Coalesce queued prompts into batched model calls"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._batch_queue.get()]
+            # Brief window so concurrent callers can join the batch
+            deadline = loop.time() + self._batch_window
+            while len(batch) < self._max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._batch_queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            prompts = [prompt for prompt, _ in batch]
+            try:
+                answers = await loop.run_in_executor(
+                    self._gpu_executor, self._generate_batch_sync, prompts
+                )
+                for (_, future), answer in zip(batch, answers):
+                    if not future.done():
+                        future.set_result(answer)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _generate_batch_sync(self, prompts: list) -> list:
+        """Blocking batched tokenize/generate/decode; runs on the GPU worker"""
+        tokenizer = self.model_manager.tokenizer
+        if tokenizer.pad_token is None:
+            tokenizer.pad_token = tokenizer.eos_token
+        inputs = tokenizer(
+            prompts, return_tensors="pt", padding=True,
+            truncation=True, max_length=self.model_manager.max_length
+        )
+        # Per-tensor non-blocking copies let the H2D transfer overlap
+        # with whatever the GPU is still finishing
+        device = self.model_manager.device
+        inputs = {k: v.to(device, non_blocking=True) for k, v in inputs.items()}
+        outputs = self.model_manager.model.generate(
+            inputs["input_ids"],
+            attention_mask=inputs["attention_mask"],
+            max_length=self.model_manager.max_length,
+            temperature=0.7,
+            do_sample=True
+        )
+        return [tokenizer.decode(output, skip_special_tokens=True) for output in outputs]
+
     async def get_model_info(self, params: Dict = None) -> Dict:
         """Get information about the current model"""
         if not self.initialized:
             return {"error": "Server not initialized"}
-            
-        return {
-            "name": self.model_manager.model_name,
-            "device": self.model_manager.device,
-            "maxLength": self.model_manager.max_length
-        }
+
+        # Static per model; build once and reuse
+        if self._model_info is None:
+            self._model_info = {
+                "name": self.model_manager.model_name,
+                "device": self.model_manager.device,
+                "maxLength": self.model_manager.max_length
+            }
+        return self._model_info
 
     async def handle_request(self, request: Dict) -> Dict:
         """Handle an incoming JSON-RPC request"""
@@ -125,11 +223,11 @@ async def main():
                 break
                 
             try:
-                request = json.loads(line)
+                request = _loads(line)
                 response = await server.handle_request(request)
-                sys.stdout.write(json.dumps(response) + "\n")
+                sys.stdout.buffer.write(_dumps(response) + b"\n")
                 sys.stdout.flush()
-            except json.JSONDecodeError:
+            except ValueError:
                 logger.error("Invalid JSON received")
                 continue
                 
@@ -4,13 +4,47 @@ Handles task planning and execution strategies
 """
 
 from typing import Dict, List, Any, Optional
+import asyncio
+import hashlib
 import json
 import logging
+import re
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from model_manager import ModelManager
 
 logger = logging.getLogger(__name__)
 
+# Fast C JSON codec for prompt building and plan parsing, with a
+# stdlib fallback
+try:
+    import orjson
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj).encode('utf-8')
+    _loads = json.loads
+
+# Aho-Corasick automaton for pattern matching when available; the
+# plain substring scan remains as fallback
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# One compiled pass per response line: numbered step, tool, or
+# parameters; anything else is ignored
+_STEP_RE = re.compile(
+    r'^[ \t]*(?:'
+    r'(?P<step>\d+\..*?)'
+    r'|.*?\btool:[ \t]*(?P<tool>.+?)'
+    r'|.*?\b(?:parameters|params):[ \t]*(?P<params>.+?)'
+    r')[ \t]*\r?$',
+    re.IGNORECASE | re.MULTILINE
+)
+
 class Task:
     def __init__(self, goal: str, steps: List[Dict], task_id: str = None):
         self.id = task_id
@@ -45,18 +79,137 @@ class Task:
             "end_time": self.end_time
         }
 
+# Static plan-prompt boilerplate kept as one reusable block; it leads
+# the prompt so prefix KV caches can reuse it across requests
+_PLAN_PROMPT_PREFIX = """Create a detailed plan for this task. Break it down into specific steps using available tools.
+
+Available Tools:
+- read_file: Read file contents
+- write_file: Create or update files
+- search_code: Search through codebase
+- analyze_code: Check for errors/issues
+- execute_command: Run system commands
+- model1: Use AI model for complex tasks
+
+Format your response as a numbered list of steps. For each step, specify the tool to use and any parameters needed."""
+
+class _BatchedModelClient:
+    """Coalesces concurrent generate calls into one batched model run"""
+
+    def __init__(self, model_manager, max_batch: int = 8, window: float = 0.010):
+        self.model_manager = model_manager
+        self.max_batch = max_batch
+        self.window = window
+        self._pending = []
+        self._flush_handle = None
+        # One worker: generate_response_batch mutates tokenizer state
+        # and runs model.generate, neither of which is thread-safe, so
+        # overlapping flushes must queue rather than run concurrently
+        self._model_executor = ThreadPoolExecutor(max_workers=1)
+
+    async def generate(self, prompt: str) -> Optional[str]:
+        """Queue a prompt and wait for its slot of the batched result"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((prompt, future))
+
+        if len(self._pending) >= self.max_batch:
+            if self._flush_handle is not None:
+                self._flush_handle.cancel()
+                self._flush_handle = None
+            asyncio.ensure_future(self._flush())
+        elif self._flush_handle is None:
+            # Brief window so concurrent callers can join the batch
+            self._flush_handle = loop.call_later(
+                self.window, lambda: asyncio.ensure_future(self._flush())
+            )
+
+        return await future
+
+    async def _flush(self):
+        self._flush_handle = None
+        batch = self._pending[:self.max_batch]
+        self._pending = self._pending[self.max_batch:]
+        if not batch:
+            return
+
+        loop = asyncio.get_running_loop()
+        if self._pending:
+            self._flush_handle = loop.call_later(
+                self.window, lambda: asyncio.ensure_future(self._flush())
+            )
+
+        prompts = [prompt for prompt, _ in batch]
+        try:
+            answers = await loop.run_in_executor(
+                self._model_executor, self.model_manager.generate_response_batch, prompts
+            )
+            for (_, future), answer in zip(batch, answers):
+                if not future.done():
+                    future.set_result(answer)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
 class PlanningSystem:
+    # Keyword-to-tool table and tool set built once; the old if/elif
+    # chain re-ran its substring tests and rebuilt the set per call
+    _KEYWORD_TO_TOOL = (
+        (("read", "file"), "read_file"),
+        (("write", "file"), "write_file"),
+        (("search",), "semantic_search"),
+        (("error",), "get_errors"),
+        (("check",), "get_errors"),
+        (("run",), "execute_command"),
+        (("execute",), "execute_command"),
+    )
+    _VALID_TOOLS = frozenset({
+        "read_file", "write_file", "semantic_search", "get_errors",
+        "execute_command", "model1"
+    })
+    # How each tool touches the workspace: read-only steps can run
+    # concurrently, writes act as ordering barriers
+    _TOOL_SIDE_EFFECTS = {
+        "read_file": "read",
+        "write_file": "write",
+        "execute_command": "write",
+        "semantic_search": "read",
+        "get_errors": "read",
+        "model1": "read",
+    }
+
     def __init__(self, model_name: str = "microsoft/DialoGPT-small"):
         self.current_plan: Optional[List[Dict]] = None
         self.fallback_strategies: Dict[str, List[Dict]] = {}
         self.planning_rules = self._load_planning_rules()
+        # Lowercased compound-task keys computed once at load time
+        # rather than per planning call
+        self._compound_items = tuple(
+            (name.lower(), subtasks)
+            for name, subtasks in self.planning_rules.get("compound_tasks", {}).items()
+        )
+        self._pattern_ac = None
+        self._compound_ac = None
+        self._build_pattern_automata()
         self.model_manager = ModelManager(model_name=model_name)
+        self._batched_model = _BatchedModelClient(self.model_manager)
+        # LRU over finished plans: identical (goal, context) pairs skip
+        # the model round-trip entirely
+        self._plan_cache: OrderedDict = OrderedDict()
+        self._plan_cache_max = 512
+
+    @staticmethod
+    def _plan_cache_key(goal: str, context: List[Dict]) -> str:
+        """Stable digest of a goal and its context"""
+        payload = goal + json.dumps(context or [], sort_keys=True)
+        return hashlib.blake2b(payload.encode('utf-8')).hexdigest()
 
     def _load_planning_rules(self) -> Dict:
         """Load planning rules from JSON file"""
         try:
-            with open('planning_rules.json', 'r') as f:
-                return json.load(f)
+            with open('planning_rules.json', 'rb') as f:
+                return _loads(f.read())
         except FileNotFoundError:
             logger.error("Planning rules file not found, using default rules")
             return {
@@ -64,34 +217,52 @@ class PlanningSystem:
                 "compound_tasks": {}
             }
 
-    async def _get_model_plan(self, goal: str, context: List[Dict]) -> Optional[str]:
-        """Get plan from model using local ModelManager"""
+    def _build_pattern_automata(self):
+        """Compile planning-rule patterns into Aho-Corasick automata"""
+        if ahocorasick is None:
+            return
         try:
-            # Create a detailed prompt for plan generation
-            context_str = "\n".join([json.dumps(ctx) for ctx in context]) if context else "No additional context."
-            prompt = f"""Create a detailed plan for this task. Break it down into specific steps using available tools.
+            pattern_ac = ahocorasick.Automaton()
+            for task_name, pattern in self.planning_rules.get("task_patterns", {}).items():
+                for p in pattern.get("patterns", []):
+                    pattern_ac.add_word(p, pattern.get("tools", []))
+            if len(pattern_ac) > 0:
+                pattern_ac.make_automaton()
+                self._pattern_ac = pattern_ac
 
-Task Goal: {goal}
+            compound_ac = ahocorasick.Automaton()
+            for task_name, subtasks in self.planning_rules.get("compound_tasks", {}).items():
+                compound_ac.add_word(task_name.lower(), subtasks)
+            if len(compound_ac) > 0:
+                compound_ac.make_automaton()
+                self._compound_ac = compound_ac
+        except Exception as e:
+            logger.error(f"Error building pattern automata: {str(e)}")
+            self._pattern_ac = None
+            self._compound_ac = None
 
-Context:
-{context_str}
+    def _build_plan_prompt(self, goal: str, context: List[Dict]) -> str:
+        """Create a detailed prompt for plan generation"""
+        if context:
+            # Serialize once and drop repeated blocks; agent flows
+            # often resend identical memory entries
+            unique = dict.fromkeys(_dumps(ctx) for ctx in context)
+            context_str = b"\n".join(unique).decode()
+        else:
+            context_str = "No additional context."
 
-Available Tools:
-- read_file: Read file contents
-- write_file: Create or update files
-- search_code: Search through codebase
-- analyze_code: Check for errors/issues
-- execute_command: Run system commands
-- model1: Use AI model for complex tasks
+        # Dynamic goal and context go after the static prefix
+        return f"{_PLAN_PROMPT_PREFIX}\n\nTask Goal: {goal}\n\nContext:\n{context_str}"
 
-Format your response as a numbered list of steps. For each step, specify the tool to use and any parameters needed."""
+    async def _get_model_plan(self, goal: str, context: List[Dict]) -> Optional[str]:
+        """Get plan from model using local ModelManager"""
+        try:
+            prompt = self._build_plan_prompt(goal, context)
+
+            # Coalesced with any concurrent planning calls, and run off
+            # the event loop
+            return await self._batched_model.generate(prompt)
 
-            # Execute model request using model manager
-            response = await self.model_manager.execute_model("generate", {"ask": prompt})
-            if response and "result" in response:
-                return response["result"].get("answer")
-            return None
-            
         except Exception as e:
             logger.error(f"Error getting model plan: {str(e)}")
             return None
@@ -100,37 +271,29 @@ Format your response as a numbered list of steps. For each step, specify the too
         """Parse model response into a structured plan"""
         plan = []
         try:
-            lines = response.split('\n')
             current_step = {}
-            
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                    
-                # Look for numbered steps
-                if line[0].isdigit() and '.' in line[:3]:
+
+            for m in _STEP_RE.finditer(response):
+                kind = m.lastgroup
+                if kind == "step":
                     # Save previous step if exists
                     if current_step:
                         plan.append(current_step)
-                    current_step = {"description": line}
-                    continue
-                
-                line_lower = line.lower()
-                # Extract tool and parameters from step details
-                if "tool:" in line_lower:
-                    tool = line_lower.split("tool:")[1].strip()
+                    current_step = {"description": m.group("step")}
+
+                elif kind == "tool":
+                    tool = m.group("tool").lower()
                     if tool == "search_code":
                         tool = "semantic_search"  # Map to actual tool name
                     current_step["tool"] = tool
                     current_step["action"] = tool
-                
-                elif "parameters:" in line_lower or "params:" in line_lower:
+
+                elif kind == "params":
+                    param_str = m.group("params")
                     try:
                         # Try to parse parameters as JSON if they're in that format
-                        param_str = line.split(":", 1)[1].strip()
                         if "{" in param_str:
-                            params = json.loads(param_str)
+                            params = _loads(param_str)
                         else:
                             # Parse key-value pairs in plain text
                             params = dict(p.split("=") for p in param_str.split(","))
@@ -138,7 +301,7 @@ Format your response as a numbered list of steps. For each step, specify the too
                     except:
                         # If parsing fails, store as description
                         current_step["parameters"] = {"description": param_str}
-            
+
             # Add the last step if exists
             if current_step:
                 plan.append(current_step)
@@ -154,32 +317,20 @@ Format your response as a numbered list of steps. For each step, specify the too
 
     def _validate_and_fix_plan(self, plan: List[Dict]) -> List[Dict]:
         """Validate and fix plan steps to ensure they have all required fields"""
-        valid_tools = {
-            "read_file", "write_file", "semantic_search", "get_errors",
-            "execute_command", "model1"
-        }
-        
         fixed_plan = []
         for step in plan:
             # Ensure each step has the basic required fields
             if "tool" not in step:
                 # Try to infer tool from description
                 desc = step.get("description", "").lower()
-                if "read" in desc and "file" in desc:
-                    step["tool"] = "read_file"
-                elif "write" in desc and "file" in desc:
-                    step["tool"] = "write_file"
-                elif "search" in desc:
-                    step["tool"] = "semantic_search"
-                elif "error" in desc or "check" in desc:
-                    step["tool"] = "get_errors"
-                elif "run" in desc or "execute" in desc:
-                    step["tool"] = "execute_command"
-                else:
-                    step["tool"] = "model1"
-            
+                step["tool"] = next(
+                    (tool for keywords, tool in self._KEYWORD_TO_TOOL
+                     if all(kw in desc for kw in keywords)),
+                    "model1"
+                )
+
             # Validate tool name
-            if step["tool"] not in valid_tools:
+            if step["tool"] not in self._VALID_TOOLS:
                 logger.warning(f"Invalid tool {step['tool']}, defaulting to model1")
                 step["tool"] = "model1"
             
@@ -197,32 +348,144 @@ Format your response as a numbered list of steps. For each step, specify the too
     async def create_plan(self, goal: str, context: List[Dict]) -> List[Dict]:
         """Create execution plan for goal using local model manager"""
         try:
-            # Get plan from model
-            result = await self._get_model_plan(goal, context)
-            
+            cache_key = self._plan_cache_key(goal, context)
+            cached = self._plan_cache.get(cache_key)
+            if cached is not None:
+                self._plan_cache.move_to_end(cache_key)
+                self.current_plan = cached
+                return cached
+
+            # Predict the fallback plan while the model call is in
+            # flight, so a model miss costs no extra latency
+            model_task = asyncio.create_task(self._get_model_plan(goal, context))
+            rule_based_plan = self._create_rule_based_plan(goal)
+            result = await model_task
+
             if result:
                 # Parse model response into a plan
                 plan = self._parse_model_response(result)
                 if plan:
                     self.current_plan = plan
+                    self._cache_plan(cache_key, plan)
                     return plan
-                    
-            # If model plan fails, try using planning rules
-            rule_based_plan = self._create_rule_based_plan(goal)
+
+            # If model plan fails, fall back to the predicted rule plan
             if rule_based_plan:
                 self.current_plan = rule_based_plan
+                self._cache_plan(cache_key, rule_based_plan)
                 return rule_based_plan
-                    
+
             # Basic fallback plan if all else fails
             basic_plan = self._create_basic_plan(goal)
             self.current_plan = basic_plan
+            self._cache_plan(cache_key, basic_plan)
             return basic_plan
-            
+
         except Exception as e:
             logger.error(f"Error creating plan: {str(e)}")
             # Ultimate fallback - use model
             return [{"action": "model1", "tool": "model1"}]
-            
+
+    async def stream_plan(self, goal: str, context: List[Dict]):
+        """Yield validated plan steps as the model response streams in"""
+        prompt = self._build_plan_prompt(goal, context)
+        loop = asyncio.get_running_loop()
+        token_iter = self.model_manager.generate_response_stream(prompt)
+
+        buffer = ""
+        current_step: Dict = {}
+
+        def handle_line(line: str) -> Optional[Dict]:
+            nonlocal current_step
+            m = _STEP_RE.match(line)
+            if not m:
+                return None
+            kind = m.lastgroup
+            if kind == "step":
+                finished = current_step if current_step else None
+                current_step = {"description": m.group("step")}
+                return finished
+            if kind == "tool":
+                tool = m.group("tool").lower()
+                if tool == "search_code":
+                    tool = "semantic_search"
+                current_step["tool"] = tool
+                current_step["action"] = tool
+            elif kind == "params":
+                param_str = m.group("params")
+                try:
+                    if "{" in param_str:
+                        current_step["parameters"] = _loads(param_str)
+                    else:
+                        current_step["parameters"] = dict(
+                            p.split("=") for p in param_str.split(",")
+                        )
+                except Exception:
+                    current_step["parameters"] = {"description": param_str}
+            return None
+
+        try:
+            while True:
+                # The token iterator blocks on the generation thread,
+                # so each pull runs off the event loop
+                chunk = await loop.run_in_executor(None, next, token_iter, None)
+                if chunk is None:
+                    break
+                buffer += chunk
+                while '\n' in buffer:
+                    line, buffer = buffer.split('\n', 1)
+                    finished = handle_line(line)
+                    if finished:
+                        yield self._validate_and_fix_plan([finished])[0]
+
+            if buffer:
+                finished = handle_line(buffer)
+                if finished:
+                    yield self._validate_and_fix_plan([finished])[0]
+            if current_step:
+                yield self._validate_and_fix_plan([current_step])[0]
+
+        except Exception as e:
+            logger.error(f"Error streaming plan: {str(e)}")
+
+    async def execute_plan(self, plan: List[Dict], tool_manager) -> List[Dict]:
+        """Execute a plan, running consecutive read-only steps concurrently"""
+        results = []
+        batch = []
+
+        async def flush_batch():
+            if batch:
+                results.extend(await asyncio.gather(*[
+                    tool_manager.execute_tool(step["tool"], step.get("parameters", {}))
+                    for step in batch
+                ]))
+                batch.clear()
+
+        try:
+            for step in plan:
+                effect = self._TOOL_SIDE_EFFECTS.get(step.get("tool"), "write")
+                if effect == "read":
+                    batch.append(step)
+                    continue
+                # Writes wait for pending reads and run alone, so
+                # ordering across side effects is preserved
+                await flush_batch()
+                results.append(await tool_manager.execute_tool(
+                    step["tool"], step.get("parameters", {})
+                ))
+            await flush_batch()
+            return results
+
+        except Exception as e:
+            logger.error(f"Error executing plan: {str(e)}")
+            raise
+
+    def _cache_plan(self, cache_key: str, plan: List[Dict]):
+        """Store a finished plan, evicting the least recently used"""
+        self._plan_cache[cache_key] = plan
+        if len(self._plan_cache) > self._plan_cache_max:
+            self._plan_cache.popitem(last=False)
+
     def _create_basic_plan(self, goal: str) -> List[Dict]:
         """Create basic plan based on goal keywords"""
         goal_lower = goal.lower()
@@ -246,7 +509,21 @@ Format your response as a numbered list of steps. For each step, specify the too
         """Create a plan based on planning rules"""
         try:
             goal_lower = goal.lower()
-            
+
+            # Single linear pass over the goal when the automata exist
+            if self._pattern_ac is not None:
+                for _, tools in self._pattern_ac.iter(goal_lower):
+                    return [
+                        {"action": tool, "tool": tool, "parameters": {}}
+                        for tool in tools
+                    ]
+                if self._compound_ac is not None:
+                    for _, subtasks in self._compound_ac.iter(goal_lower):
+                        plan = self._expand_compound_task(subtasks)
+                        if plan:
+                            return plan
+                return None
+
             # Check task patterns
             for task_name, pattern in self.planning_rules.get("task_patterns", {}).items():
                 if any(p in goal_lower for p in pattern.get("patterns", [])):
@@ -254,24 +531,30 @@ Format your response as a numbered list of steps. For each step, specify the too
                         {"action": tool, "tool": tool, "parameters": {}}
                         for tool in pattern.get("tools", [])
                     ]
-            
+
             # Check compound tasks
-            for task_name, subtasks in self.planning_rules.get("compound_tasks", {}).items():
-                if task_name.lower() in goal_lower:
-                    plan = []
-                    for subtask in subtasks:
-                        # Look up tools for each subtask
-                        if subtask in self.planning_rules.get("task_patterns", {}):
-                            tools = self.planning_rules["task_patterns"][subtask].get("tools", [])
-                            plan.extend([
-                                {"action": tool, "tool": tool, "parameters": {}}
-                                for tool in tools
-                            ])
+            for name_lower, subtasks in self._compound_items:
+                if name_lower in goal_lower:
+                    plan = self._expand_compound_task(subtasks)
                     if plan:
                         return plan
-            
+
             return None
-            
+
         except Exception as e:
             logger.error(f"Error in rule-based planning: {str(e)}")
             return None
+
+    def _expand_compound_task(self, subtasks: List[str]) -> List[Dict]:
+        """Expand a compound task's subtasks into tool steps"""
+        plan = []
+        task_patterns = self.planning_rules.get("task_patterns", {})
+        for subtask in subtasks:
+            # Look up tools for each subtask
+            if subtask in task_patterns:
+                tools = task_patterns[subtask].get("tools", [])
+                plan.extend([
+                    {"action": tool, "tool": tool, "parameters": {}}
+                    for tool in tools
+                ])
+        return plan
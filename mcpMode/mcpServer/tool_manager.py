@@ -3,20 +3,49 @@ Tool Manager Implementation for MCP Server
 Handles tool execution and management using JSON-RPC 2.0 protocol
 """
 
+import copy
 import logging
+import time
 from typing import Dict, Any, Optional, List
-from datetime import datetime
+from collections import OrderedDict, deque
 from pathlib import Path
-import subprocess
+import mmap
+import re
 import os
+import shlex
+import sys
 import yaml
-from functools import wraps
+from functools import lru_cache, wraps
 import asyncio
-from fnmatch import fnmatch
+import fnmatch
 
 # Setup logging
 logger = logging.getLogger(__name__)
 
+# Non-blocking file reads when aiofiles is installed; thread-pool
+# reads otherwise
+try:
+    import aiofiles
+except ImportError:
+    aiofiles = None
+
+# Fast C JSON decode for ripgrep's NDJSON output, stdlib fallback
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    import json
+    _loads = json.loads
+
+@lru_cache(maxsize=256)
+def _query_pattern(query: str) -> "re.Pattern":
+    """Compiled case-insensitive pattern for a literal search query"""
+    return re.compile(re.escape(query), re.IGNORECASE)
+
+# Parsed config keyed by file stat: repeated ToolManager construction
+# skips the YAML parse until config.yaml actually changes
+_CONFIG_CACHE: Dict[tuple, Dict] = {}
+
 def load_config():
     """Load configuration from yaml file"""
     config_path = Path("config.yaml")
@@ -32,9 +61,17 @@ def load_config():
         with open(config_path, 'w') as f:
             yaml.dump(default_config, f)
         return default_config
-    
-    with open(config_path) as f:
-        return yaml.safe_load(f)
+
+    st = config_path.stat()
+    key = (st.st_mtime_ns, st.st_size)
+    cached = _CONFIG_CACHE.get(key)
+    if cached is None:
+        with open(config_path) as f:
+            cached = yaml.safe_load(f)
+        _CONFIG_CACHE.clear()
+        _CONFIG_CACHE[key] = cached
+    # Callers get their own copy so the cached dict stays pristine
+    return copy.deepcopy(cached)
 
 def with_retry(max_retries=3, delay=1):
     """Decorator for adding retry logic to async functions"""
@@ -59,24 +96,45 @@ class ToolManager:
         self.config = load_config()
         self.workspace_root = Path(self.config["workspace_root"]).resolve()
         self.workspace_root.mkdir(parents=True, exist_ok=True)
-        self.allowed_commands = set(self.config["allowed_commands"])
-        self.execution_history = []
+        # Root resolved once; per-call validation is pure string work
+        self._root_str = str(self.workspace_root)
+        self._root_prefix = self._root_str + os.sep
+        # Interned members make the per-call lookup a pointer compare
+        self.allowed_commands = frozenset(
+            sys.intern(c) for c in self.config["allowed_commands"]
+        )
+        # Bounded deque: old entries age out in O(1) instead of the
+        # list growing for the life of the process
+        self.execution_history: deque = deque(maxlen=10_000)
+        # Compile results keyed by (path, mtime, size); unchanged files
+        # skip the re-read and re-compile on repeated checks
+        self._compile_cache: OrderedDict = OrderedDict()
+        self._compile_cache_max = 4096
         logger.info(f"Initialized ToolManager with workspace: {self.workspace_root}")
 
     def validate_path(self, path: str) -> Path:
         """Validate and resolve file path"""
         try:
-            input_path = Path(path)
-            if input_path.is_absolute():
-                full_path = input_path
+            path_str = str(path)
+
+            # Fast path: an absolute path already under the workspace
+            # needs no normalization or syscalls, provided it has no
+            # '..' components that could climb back out
+            if path_str.startswith(self._root_prefix) and '..' not in path_str:
+                return Path(path_str)
+
+            if os.path.isabs(path_str):
+                full_path = os.path.normpath(path_str)
             else:
-                full_path = (self.workspace_root / input_path).resolve()
-                
-            if not str(full_path).startswith(str(self.workspace_root)):
+                # String normalization instead of resolve(), which
+                # stats every path component
+                full_path = os.path.normpath(os.path.join(self._root_prefix, path_str))
+
+            if full_path != self._root_str and not full_path.startswith(self._root_prefix):
                 raise ValueError(f"Access denied: Path {path} outside workspace")
-                
-            return full_path
-            
+
+            return Path(full_path)
+
         except Exception as e:
             logger.error(f"Path validation error: {str(e)}")
             raise ValueError(f"Invalid path: {str(e)}")
@@ -85,14 +143,16 @@ class ToolManager:
     async def execute_tool(self, method: str, params: Dict) -> Dict:
         """Execute tool using JSON-RPC 2.0"""
         try:
-            request_id = datetime.now().timestamp()
-            
+            # Cheap monotonic id and raw float timestamp; datetime
+            # formatting is deferred to whoever reads the history
+            request_id = time.monotonic_ns()
+
             result = await self._handle_method(method, params)
-            
+
             self.execution_history.append({
                 "method": method,
                 "params": params,
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": time.time(),
                 "success": True
             })
             
@@ -139,15 +199,33 @@ class ToolManager:
                 raise FileNotFoundError(f"File not found: {path}")
             
             logger.info(f"Reading file: {path}")
+            size = path.stat().st_size
+
+            if "start_line" in params and "end_line" in params and size:
+                # Map the file and stop at end_line; partial reads no
+                # longer decode the whole file
+                start_line = params["start_line"]
+                end_line = params["end_line"]
+                chunks = []
+                with open(path, 'rb') as f:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        for lineno, line in enumerate(iter(mm.readline, b'')):
+                            if lineno > end_line:
+                                break
+                            if lineno >= start_line:
+                                chunks.append(line)
+                content = '\n'.join(b''.join(chunks).decode('utf-8').splitlines())
+                return {"content": content}
+
+            if size > 1024 * 1024:
+                # Large full reads skip the stdlib's intermediate buffer
+                with open(path, 'rb') as f:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        return {"content": mm[:].decode('utf-8')}
+
             with open(path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            if "start_line" in params and "end_line" in params:
-                lines = content.splitlines()
-                content = '\n'.join(lines[params["start_line"]:params["end_line"] + 1])
-            
-            return {"content": content}
-            
+                return {"content": f.read()}
+
         except Exception as e:
             logger.error(f"Error reading file: {str(e)}")
             raise
@@ -170,26 +248,40 @@ class ToolManager:
     async def execute_command(self, params: Dict) -> Dict:
         """Execute terminal command"""
         try:
-            command_parts = params["command"].split()
-            if command_parts[0] not in self.allowed_commands:
+            # Check the first token without splitting the whole string
+            command = params["command"]
+            sep = command.find(' ')
+            head = command[:sep] if sep > 0 else command
+            if sys.intern(head) not in self.allowed_commands:
                 raise ValueError("Command not allowed")
-            
-            result = subprocess.run(
-                command_parts,
+
+            # shlex respects quoting when building the argv
+            command_parts = shlex.split(command)
+
+            # Non-blocking subprocess: other tool calls keep running
+            # while the command executes
+            proc = await asyncio.create_subprocess_exec(
+                *command_parts,
                 cwd=params.get("cwd", str(self.workspace_root)),
-                capture_output=True,
-                text=True,
-                timeout=params.get("timeout", self.config["security"]["request_timeout_seconds"])
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
             )
-            
+            timeout = params.get("timeout", self.config["security"]["request_timeout_seconds"])
+            try:
+                stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.wait()
+                raise TimeoutError("Command timed out")
+
             return {
-                "stdout": result.stdout,
-                "stderr": result.stderr,
-                "returncode": result.returncode
+                "stdout": stdout.decode(),
+                "stderr": stderr.decode(),
+                "returncode": proc.returncode
             }
-            
-        except subprocess.TimeoutExpired:
-            raise TimeoutError("Command timed out")
+
+        except TimeoutError:
+            raise
         except Exception as e:
             logger.error(f"Error executing command: {str(e)}")
             raise
@@ -197,29 +289,90 @@ class ToolManager:
     async def search_code(self, params: Dict) -> Dict:
         """Search code in workspace"""
         try:
-            results = []
             pattern = params.get("file_pattern", "**/*")
-            query = params["query"].lower()
-            
-            for file in self.workspace_root.rglob(pattern):
-                if file.is_file():
+            query = params["query"]
+
+            # Native multi-threaded scan when ripgrep is available
+            if self.config.get("use_ripgrep", True):
+                results = await self._search_code_rg(query, pattern)
+                if results is not None:
+                    return {"results": results}
+
+            regex = _query_pattern(query)
+
+            # Directory walk is blocking; run it off the event loop
+            files = await asyncio.to_thread(
+                lambda: [f for f in self.workspace_root.rglob(pattern) if f.is_file()]
+            )
+
+            # Bounded concurrency: overlap disk latency across files
+            # without opening thousands of handles at once
+            sem = asyncio.Semaphore(32)
+
+            async def scan(file: Path) -> Optional[Dict]:
+                async with sem:
                     try:
-                        with open(file, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                            if query in content.lower():
-                                results.append({
-                                    "file": str(file.relative_to(self.workspace_root)),
-                                    "matches": content.count(query)
-                                })
+                        if aiofiles is not None:
+                            async with aiofiles.open(file, 'r', encoding='utf-8',
+                                                     errors='ignore') as f:
+                                content = await f.read()
+                        else:
+                            content = await asyncio.to_thread(
+                                file.read_text, encoding='utf-8', errors='ignore'
+                            )
                     except Exception:
-                        continue
-            
-            return {"results": results}
-            
+                        return None
+                # One C-level scan matches and counts; no lowered copy
+                matches = len(regex.findall(content))
+                if matches:
+                    return {
+                        "file": str(file.relative_to(self.workspace_root)),
+                        "matches": matches
+                    }
+                return None
+
+            scanned = await asyncio.gather(*(scan(file) for file in files))
+            return {"results": [r for r in scanned if r is not None]}
+
         except Exception as e:
             logger.error(f"Error searching code: {str(e)}")
             raise
 
+    async def _search_code_rg(self, query: str, pattern: str) -> Optional[List[Dict]]:
+        """Count matches per file with ripgrep; None means fall back"""
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                "rg", "--json", "-i", "--fixed-strings", "-g", pattern,
+                "--", query, self._root_str,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL
+            )
+        except FileNotFoundError:
+            # rg not installed
+            return None
+
+        stdout, _ = await proc.communicate()
+        if proc.returncode not in (0, 1):
+            # rg rejected the pattern; let the Python path handle it
+            return None
+
+        counts: Dict[str, int] = {}
+        for line in stdout.splitlines():
+            try:
+                event = _loads(line)
+            except ValueError:
+                continue
+            if event.get("type") != "match":
+                continue
+            data = event["data"]
+            path = data.get("path", {}).get("text")
+            if not path:
+                continue
+            rel = os.path.relpath(path, self._root_str)
+            counts[rel] = counts.get(rel, 0) + len(data.get("submatches", ()))
+
+        return [{"file": file, "matches": n} for file, n in counts.items()]
+
     async def search_files(self, params: Dict) -> Dict:
         """Search for files matching pattern"""
         try:
@@ -230,31 +383,25 @@ class ToolManager:
                 pattern = '**/' + pattern
                 
             pattern = pattern.replace('\\', '/')
-            
+
+            # Compile the glob once; a single regex match per file
+            # replaces the per-component fnmatch cascade
+            regex = re.compile(fnmatch.translate(pattern))
+
             matches = []
             for root, dirs, files in os.walk(self.workspace_root):
                 rel_path = Path(root).relative_to(self.workspace_root)
                 for file in files:
-                    file_path = rel_path / file
-                    if self._matches_pattern(str(file_path), pattern.split('/')):
-                        matches.append(str(file_path))
-            
+                    file_path = str(rel_path / file)
+                    if regex.match(file_path.replace(os.sep, '/')):
+                        matches.append(file_path)
+
             return {"files": matches}
-            
+
         except Exception as e:
             logger.error(f"Error searching files: {str(e)}")
             raise
 
-    def _matches_pattern(self, path: str, pattern_parts: List[str]) -> bool:
-        """Check if path matches pattern parts"""
-        path_parts = path.split(os.sep)
-        if len(pattern_parts) > len(path_parts):
-            return False
-        return all(
-            fnmatch(part, pattern)
-            for part, pattern in zip(path_parts[-len(pattern_parts):], pattern_parts)
-        )
-
     async def check_errors(self, params: Dict) -> Dict:
         """Check for errors in files"""
         errors = []
@@ -265,16 +412,35 @@ class ToolManager:
                     continue
                 
                 if full_path.suffix == '.py':
+                    st = full_path.stat()
+                    key = (str(full_path), st.st_mtime_ns, st.st_size)
+                    if key in self._compile_cache:
+                        self._compile_cache.move_to_end(key)
+                        cached = self._compile_cache[key]
+                        if cached is not None:
+                            errors.append({"file": str(file_path), **cached})
+                        continue
+
+                    error = None
                     try:
-                        with open(full_path) as f:
-                            compile(f.read(), str(full_path), 'exec')
+                        # Hand the mapped bytes straight to compile()
+                        if st.st_size:
+                            with open(full_path, 'rb') as f:
+                                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                                    compile(bytes(mm), str(full_path), 'exec')
+                        else:
+                            compile(b'', str(full_path), 'exec')
                     except Exception as e:
-                        errors.append({
-                            "file": str(file_path),
+                        error = {
                             "line": getattr(e, 'lineno', None),
                             "message": str(e)
-                        })
-                        
+                        }
+                        errors.append({"file": str(file_path), **error})
+
+                    self._compile_cache[key] = error
+                    if len(self._compile_cache) > self._compile_cache_max:
+                        self._compile_cache.popitem(last=False)
+
             except Exception as e:
                 logger.error(f"Error checking {file_path}: {str(e)}")
                 
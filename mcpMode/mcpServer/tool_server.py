@@ -7,32 +7,234 @@ import sys
 import json
 import logging
 import asyncio
+import fnmatch
+import mmap
 import os
-import glob
+import queue
+import re
+import shlex
 import subprocess
 import platform
+import time
+from collections import OrderedDict
+from logging.handlers import QueueHandler, QueueListener
+from functools import lru_cache
+from types import MappingProxyType
 from typing import Dict, Any, List, Optional
 
 # Set Windows event loop policy before anything else
 if platform.system() == 'Windows':
     asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+else:
+    # libuv event loop when available: fewer syscalls per request on
+    # the readline/drain-heavy paths, no handler changes needed
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
 
-# Setup logging with more detailed formatting
+# Setup logging: handlers run on a background listener thread, so a log
+# call on the request path is just a queue put, never a disk write
 log_dir = os.path.dirname(os.path.abspath(__file__))
 log_file = os.path.join(log_dir, 'tool_server.log')
 os.makedirs(log_dir, exist_ok=True)  # Ensure directory exists
 
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s.%(msecs)03d - %(name)s - [%(levelname)s] - %(threadName)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S',
-    handlers=[
-        logging.FileHandler(log_file, mode='w', encoding='utf-8'),
-        logging.StreamHandler(sys.stderr)
-    ]
+_log_formatter = logging.Formatter(
+    '%(asctime)s.%(msecs)03d - %(name)s - [%(levelname)s] - %(threadName)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
 )
+_file_handler = logging.FileHandler(log_file, mode='w', encoding='utf-8')
+_file_handler.setFormatter(_log_formatter)
+_console_handler = logging.StreamHandler(sys.stderr)
+_console_handler.setFormatter(_log_formatter)
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_log_listener = QueueListener(_log_queue, _file_handler, _console_handler,
+                              respect_handler_level=True)
+_log_listener.start()
+logging.basicConfig(level=logging.INFO, handlers=[QueueHandler(_log_queue)])
 logger = logging.getLogger('tool_server')
 
+# Fast C JSON codec for the request loop, with a stdlib fallback
+try:
+    import orjson
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj).encode('utf-8')
+    _loads = json.loads
+
+# Parse failures all get the same frame; details go to the log
+_PARSE_ERROR = b'{"jsonrpc": "2.0", "error": {"code": -32700, "message": "Parse error"}, "id": null}\n'
+
+# Non-blocking file reads/writes when aiofiles is installed;
+# thread-pool fallback otherwise
+try:
+    import aiofiles
+except ImportError:
+    aiofiles = None
+
+# Commands containing any of these need a real shell; plain argv
+# commands are exec'd directly without forking /bin/sh first
+_SHELL_META = frozenset('|&;<>$`*?~(){}[]!#\n')
+
+# Cap on captured stdout/stderr returned per command (10 MB)
+_MAX_COMMAND_OUTPUT = 10 * 1024 * 1024
+
+def _read_text(path: str) -> str:
+    """Blocking text read; runs off the event loop"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+def _write_bytes(path: str, data: bytes):
+    """Blocking raw write; runs off the event loop"""
+    # One unbuffered descriptor write instead of a TextIOWrapper plus
+    # BufferedWriter copying the payload through two layers
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+
+def _read_text_mmap(path: str) -> str:
+    """Decode a large file straight from a memory mapping"""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        mm = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        try:
+            return mm[:].decode('utf-8')
+        finally:
+            mm.close()
+    finally:
+        os.close(fd)
+
+# Directories never worth descending into
+_PRUNE_DIRS = frozenset({'.git', 'node_modules', '__pycache__', '.venv', 'venv'})
+
+def _walk_files(root: str):
+    """Yield file paths under root, pruning bulky metadata dirs"""
+    try:
+        entries = os.scandir(root)
+    except OSError:
+        return
+    with entries:
+        for entry in entries:
+            try:
+                # Type bits come from the dirent, no extra stat
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in _PRUNE_DIRS:
+                        yield from _walk_files(entry.path)
+                else:
+                    yield entry.path
+            except OSError:
+                continue
+
+@lru_cache(maxsize=128)
+def _glob_to_regex(pattern: str) -> "re.Pattern":
+    """Compile a glob (with {a,b} alternation) into a path regex"""
+    # Expand brace alternation, which stdlib fnmatch lacks but the
+    # default code-search pattern uses
+    def expand(pat):
+        m = re.search(r'\{([^{}]*)\}', pat)
+        if not m:
+            return [pat]
+        head, tail = pat[:m.start()], pat[m.end():]
+        return [x for option in m.group(1).split(',') for x in expand(head + option + tail)]
+
+    # Like glob, '**/' may also match zero directories
+    def expand_globstar(pat):
+        i = pat.find('**/')
+        if i == -1:
+            return [pat]
+        head, tail = pat[:i], pat[i + 3:]
+        return [head + prefix + rest
+                for rest in expand_globstar(tail)
+                for prefix in ('**/', '')]
+
+    variants = [v for p in expand(pattern) for v in expand_globstar(p)]
+    return re.compile('|'.join(fnmatch.translate(v) for v in variants))
+
+# Walked path lists keyed by root, reused while the root's mtime is
+# unchanged; file writes below a cached root evict it
+_TREE_CACHE: OrderedDict = OrderedDict()
+_TREE_CACHE_MAX = 8
+
+def _list_files(root: str) -> List[str]:
+    """Walk root, serving repeat calls from the mtime-keyed cache"""
+    st = os.stat(root)
+    entry = _TREE_CACHE.get(root)
+    if entry is not None and entry[0] == st.st_mtime_ns:
+        _TREE_CACHE.move_to_end(root)
+        return entry[1]
+    paths = list(_walk_files(root))
+    _TREE_CACHE[root] = (st.st_mtime_ns, paths)
+    if len(_TREE_CACHE) > _TREE_CACHE_MAX:
+        _TREE_CACHE.popitem(last=False)
+    return paths
+
+def _invalidate_tree_cache(path: str):
+    """Evict cached walks that contain the given path"""
+    abs_path = os.path.abspath(path)
+    for root in [r for r in _TREE_CACHE
+                 if abs_path.startswith(r + os.sep) or abs_path == r]:
+        del _TREE_CACHE[root]
+
+def _match_files(pattern: str) -> List[str]:
+    """Blocking tree walk collecting relative paths matching pattern"""
+    regex = _glob_to_regex(pattern)
+    root = os.getcwd()
+    matches = []
+    for path in _list_files(root):
+        rel = os.path.relpath(path, root).replace(os.sep, '/')
+        if regex.match(rel):
+            matches.append(rel)
+    return matches
+
+@lru_cache(maxsize=128)
+def _query_bytes_pattern(query: str) -> "re.Pattern":
+    """Compiled case-insensitive bytes pattern for a literal query"""
+    return re.compile(re.escape(query).encode('utf-8'), re.IGNORECASE)
+
+def _scan_bytes(data, pattern) -> Optional[Dict]:
+    """Return the first match's line number and snippet, or None"""
+    hit = pattern.search(data)
+    if hit is None:
+        return None
+    # Decode only the matched line, not the whole file
+    start = data.rfind(b'\n', 0, hit.start()) + 1
+    end = data.find(b'\n', hit.end())
+    if end == -1:
+        end = len(data)
+    return {
+        "line": data.count(b'\n', 0, hit.start()) + 1,
+        "snippet": data[start:end].decode('utf-8', errors='replace')
+    }
+
+def _scan_file(path: str, pattern) -> Optional[Dict]:
+    """Scan a file's memory mapping without loading it into the cache"""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        if not os.fstat(fd).st_size:
+            return None
+        mm = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        try:
+            return _scan_bytes(mm, pattern)
+        finally:
+            mm.close()
+    finally:
+        os.close(fd)
+
+def _read_bytes(path: str) -> bytes:
+    """Blocking raw read; runs off the event loop"""
+    with open(path, 'rb') as f:
+        return f.read()
+
+# Total bytes of file content kept for repeated code searches, and the
+# largest single file worth keeping (bigger ones stay on the mmap path)
+_CONTENT_CACHE_MAX = 256 * 1024 * 1024
+_CONTENT_CACHE_MAX_FILE = _CONTENT_CACHE_MAX // 16
+
 class ToolServer:
     def __init__(self):
         logger.info("Initializing ToolServer instance")
@@ -47,6 +249,16 @@ class ToolServer:
             'execute_command': self.handle_execute_command,
             'check_errors': self.handle_check_errors
         }
+        # Bound .get over a read-only view: one lookup resolves the
+        # handler without a contains-then-index double probe
+        self._dispatch = MappingProxyType(self.methods).get
+        # Pipelined clients could otherwise fork an unbounded number of
+        # subprocesses at once
+        self._exec_sema = asyncio.Semaphore(32)
+        # path -> (mtime_ns, size, bytes); repeated searches over an
+        # unchanged tree reuse content instead of re-reading every file
+        self._content_cache: OrderedDict = OrderedDict()
+        self._content_cache_size = 0
         logger.info(f"Registered {len(self.methods)} methods: {', '.join(self.methods.keys())}")
         logger.debug(f"Server instance created in memory at {hex(id(self))}")
     async def start(self, loop=None):
@@ -77,7 +289,7 @@ class ToolServer:
                     "supportedMethods": list(self.methods.keys())
                 }
             }
-            logger.info(f"Server initialized with capabilities: {capabilities}")
+            logger.debug("Server initialized with capabilities: %s", capabilities)
             
             # Step 3: Return response
             logger.debug("Returning initialize response")
@@ -91,13 +303,26 @@ class ToolServer:
         """Read file contents"""
         try:
             path = params.get('path')
-            logger.info(f"Received file read request for path: {path}")
-            if not path or not os.path.exists(path):
-                raise ValueError(f"Invalid or nonexistent path: {path}")
-                
-            with open(path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            logger.debug(f"File read successfully: {path}")
+            logger.debug("Received file read request for path: %s", path)
+            if not path:
+                raise ValueError("Missing path")
+
+            # One stat instead of an exists() probe plus getsize();
+            # the open itself is the existence check
+            try:
+                size = os.stat(path).st_size
+            except OSError:
+                raise ValueError(f"Invalid or nonexistent path: {path}") from None
+
+            if size > 1024 * 1024:
+                # Large files decode straight from the page cache
+                content = await asyncio.to_thread(_read_text_mmap, path)
+            elif aiofiles is not None:
+                async with aiofiles.open(path, 'r', encoding='utf-8') as f:
+                    content = await f.read()
+            else:
+                content = await asyncio.to_thread(_read_text, path)
+            logger.debug("File read successfully: %s", path)
             return {"content": content}
         except Exception as e:
             logger.error(f"File read error: {str(e)}")
@@ -108,13 +333,15 @@ class ToolServer:
         try:
             path = params.get('path')
             content = params.get('content')
-            logger.info(f"Received file write request for path: {path}")
+            logger.debug("Received file write request for path: %s", path)
             if not path or content is None:
                 raise ValueError("Missing path or content")
                 
-            with open(path, 'w', encoding='utf-8') as f:
-                f.write(content)
-            logger.debug(f"File written successfully: {path}")
+            # Encode once here so the worker thread only does syscalls
+            await asyncio.to_thread(_write_bytes, path, content.encode('utf-8'))
+            _invalidate_tree_cache(path)
+            self._invalidate_content(path)
+            logger.debug("File written successfully: %s", path)
             return {"success": True}
         except Exception as e:
             logger.error(f"File write error: {str(e)}")
@@ -124,7 +351,7 @@ class ToolServer:
         """Search for files matching pattern"""
         try:
             pattern = params.get('pattern')
-            logger.info(f"Received file search request for pattern: {pattern}")
+            logger.debug("Received file search request for pattern: %s", pattern)
             if not pattern:
                 raise ValueError("Missing search pattern")
               # Convert Windows path separators if present
@@ -134,15 +361,14 @@ class ToolServer:
             if '/' not in pattern:
                 pattern = '**/' + pattern
             
-            matches = []
             try:
-                for file in glob.glob(pattern, recursive=True):
-                    # Convert to relative path and normalize separators
-                    rel_path = os.path.relpath(file).replace('\\', '/')
-                    matches.append(rel_path)
-                
-                logger.debug(f"File search found {len(matches)} matches")
-                logger.debug(f"Matches: {matches}")
+                # scandir walk with one compiled pattern; glob re-stats
+                # directories and materializes intermediate lists
+                matches = await asyncio.to_thread(_match_files, pattern)
+
+                logger.debug("File search found %d matches", len(matches))
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Matches: %s", matches)
                 return {"files": matches}
                 
             except Exception as glob_error:
@@ -158,51 +384,105 @@ class ToolServer:
         try:
             query = params.get('query')
             file_pattern = params.get('filePattern', '**/*.{py,js,ts,java,cpp,c,h,hpp}')
-            logger.info(f"Received code search request for query: {query}, file pattern: {file_pattern}")
+            logger.debug("Received code search request for query: %s, file pattern: %s",
+                         query, file_pattern)
             
             if not query:
                 raise ValueError("Missing search query")
                 
-            results = []
-            for file in glob.glob(file_pattern, recursive=True):
-                try:
-                    with open(file, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        if query.lower() in content.lower():
-                            results.append({
-                                "file": file,
-                                "content": content
-                            })
-                except Exception as e:
-                    logger.warning(f"Error reading file {file}: {str(e)}")
-                    
-            logger.debug(f"Code search results: {results}")
+            # Case-insensitive scan runs on each file's mapping; hits
+            # carry the matching line, not the whole file
+            query_re = _query_bytes_pattern(query)
+            files = await asyncio.to_thread(_match_files, file_pattern.replace('\\', '/'))
+
+            # Scans run across worker threads with bounded concurrency
+            sem = asyncio.Semaphore(32)
+
+            async def scan(file: str):
+                async with sem:
+                    try:
+                        return file, await self._scan_cached(file, query_re)
+                    except Exception as e:
+                        logger.warning("Error reading file %s: %s", file, e)
+                        return file, None
+
+            scanned = await asyncio.gather(*(scan(file) for file in files))
+            results = [{"file": file, **match} for file, match in scanned if match is not None]
+
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Code search results: %s", results)
             return {"results": results}
         except Exception as e:
             logger.error(f"Code search error: {str(e)}")
             raise
+
+    async def _scan_cached(self, file: str, pattern) -> Optional[Dict]:
+        """Scan one file, reusing cached bytes while its stat is unchanged"""
+        st = await asyncio.to_thread(os.stat, file)
+        cached = self._content_cache.get(file)
+        if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            self._content_cache.move_to_end(file)
+            return await asyncio.to_thread(_scan_bytes, cached[2], pattern)
+        if st.st_size == 0:
+            return None
+        if st.st_size > _CONTENT_CACHE_MAX_FILE:
+            return await asyncio.to_thread(_scan_file, file, pattern)
+        data = await asyncio.to_thread(_read_bytes, file)
+        self._cache_content(file, st.st_mtime_ns, st.st_size, data)
+        return await asyncio.to_thread(_scan_bytes, data, pattern)
+
+    def _cache_content(self, file: str, mtime_ns: int, size: int, data: bytes):
+        """Insert file content, evicting least-recent entries over budget"""
+        old = self._content_cache.pop(file, None)
+        if old is not None:
+            self._content_cache_size -= len(old[2])
+        self._content_cache[file] = (mtime_ns, size, data)
+        self._content_cache_size += len(data)
+        while self._content_cache_size > _CONTENT_CACHE_MAX:
+            _, (_, _, evicted) = self._content_cache.popitem(last=False)
+            self._content_cache_size -= len(evicted)
+
+    def _invalidate_content(self, file: str):
+        """Drop cached content for a path this server just rewrote"""
+        old = self._content_cache.pop(file, None)
+        if old is not None:
+            self._content_cache_size -= len(old[2])
             
     async def handle_execute_command(self, params: Dict) -> Dict:
         """Execute shell command"""
         try:
             command = params.get('command')
-            logger.info(f"Received command execution request: {command}")
+            logger.debug("Received command execution request: %s", command)
             if not command:
                 raise ValueError("Missing command")
                 
-            # Execute command and capture output
-            process = await asyncio.create_subprocess_shell(
-                command,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            stdout, stderr = await process.communicate()
-            
-            logger.debug(f"Command execution completed with exit code {process.returncode}")
+            # Execute command and capture output; commands with no shell
+            # syntax skip the /bin/sh intermediary entirely
+            async with self._exec_sema:
+                if any(c in command for c in _SHELL_META):
+                    process = await asyncio.create_subprocess_shell(
+                        command,
+                        stdout=asyncio.subprocess.PIPE,
+                        stderr=asyncio.subprocess.PIPE
+                    )
+                else:
+                    process = await asyncio.create_subprocess_exec(
+                        *shlex.split(command),
+                        stdout=asyncio.subprocess.PIPE,
+                        stderr=asyncio.subprocess.PIPE
+                    )
+                stdout, stderr = await process.communicate()
+
+            # The command may have created or removed files anywhere in
+            # the tree, and subdirectory changes don't touch the cached
+            # root's mtime; drop every cached walk
+            _TREE_CACHE.clear()
+
+            logger.debug("Command execution completed with exit code %s", process.returncode)
             return {
                 "exitCode": process.returncode,
-                "stdout": stdout.decode() if stdout else "",
-                "stderr": stderr.decode() if stderr else ""
+                "stdout": stdout[:_MAX_COMMAND_OUTPUT].decode(errors='replace') if stdout else "",
+                "stderr": stderr[:_MAX_COMMAND_OUTPUT].decode(errors='replace') if stderr else ""
             }
         except Exception as e:
             logger.error(f"Command execution error: {str(e)}")
@@ -212,35 +492,120 @@ class ToolServer:
         """Check for code errors in files"""
         try:
             files = params.get('files', [])
-            logger.info(f"Received check errors request for files: {files}")
+            logger.debug("Received check errors request for files: %s", files)
             if not files:
                 raise ValueError("No files specified")
-                
+
             errors = []
-            for file in files:
-                # For Python files, use pylint
-                if file.endswith('.py'):
-                    try:
-                        process = await asyncio.create_subprocess_shell(
-                            f"pylint {file}",
-                            stdout=asyncio.subprocess.PIPE,
-                            stderr=asyncio.subprocess.PIPE
-                        )
-                        stdout, stderr = await process.communicate()
-                        if stdout:
+            # One pylint process for all Python files: linting cost is
+            # dominated by interpreter and astroid startup, paid once here
+            py_files = [file for file in files if file.endswith('.py')]
+            if py_files:
+                try:
+                    process = await asyncio.create_subprocess_exec(
+                        'pylint', '--output-format=json', *py_files,
+                        stdout=asyncio.subprocess.PIPE,
+                        stderr=asyncio.subprocess.PIPE
+                    )
+                    stdout, stderr = await process.communicate()
+                    if stdout:
+                        by_file: Dict[str, list] = {}
+                        for message in _loads(stdout):
+                            by_file.setdefault(message.get('path'), []).append(message)
+                        for path, messages in by_file.items():
                             errors.append({
-                                "file": file,
-                                "errors": stdout.decode()
+                                "file": path,
+                                "errors": messages
                             })
-                    except Exception as e:
-                        logger.warning(f"Error checking {file}: {str(e)}")
-                        
-            logger.debug(f"Check errors results: {errors}")
+                except Exception as e:
+                    logger.warning("Error checking %s: %s", py_files, e)
+
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Check errors results: %s", errors)
             return {"errors": errors}
         except Exception as e:
             logger.error(f"Error checking error: {str(e)}")
             raise
             
+    async def _process_line(self, line: bytes, client_id: str) -> Optional[bytes]:
+        """Parse and dispatch one request line, returning response bytes"""
+        if not line or line.isspace():
+            return None
+        try:
+            # Both orjson and stdlib json take bytes directly and
+            # tolerate surrounding whitespace; no decode, no strip copy
+            request = _loads(line)
+        except ValueError as e:
+            logger.error("[CLIENT %s->SERVER] Invalid JSON: %s", client_id, e)
+            return _PARSE_ERROR
+
+        if isinstance(request, list):
+            # JSON-RPC 2.0 batch: independent entries run concurrently;
+            # replies to notifications are dropped
+            results = await asyncio.gather(
+                *(self._handle_one(entry, client_id) for entry in request)
+            )
+            results = [r for r in results if r is not None]
+            if not results:
+                return None
+            return _dumps(results) + b"\n"
+
+        response = await self._handle_one(request, client_id)
+        if response is None:
+            return None
+        return _dumps(response) + b"\n"
+
+    async def _handle_one(self, request, client_id: str) -> Optional[Dict]:
+        """Handle one decoded request object; notifications get no reply"""
+        if not isinstance(request, dict):
+            return {
+                "jsonrpc": "2.0",
+                "error": {
+                    "code": -32600,
+                    "message": "Invalid Request"
+                },
+                "id": None
+            }
+
+        method = request.get('method')
+        params = request.get('params', {})
+        request_id = request.get('id')
+        logger.debug("[SERVER] Processing request from %s - Method: %s, ID: %s",
+                     client_id, method, request_id)
+
+        handler = self._dispatch(method)
+        if handler is not None:
+            try:
+                result = await handler(params)
+                response = {
+                    "jsonrpc": "2.0",
+                    "result": result,
+                    "id": request_id
+                }
+            except Exception as e:
+                logger.error("[SERVER] Error handling %s for %s: %s", method, client_id, e)
+                response = {
+                    "jsonrpc": "2.0",
+                    "error": {
+                        "code": -32000,
+                        "message": str(e)
+                    },
+                    "id": request_id
+                }
+        else:
+            logger.warning("[SERVER] Method not found for client %s: %s", client_id, method)
+            response = {
+                "jsonrpc": "2.0",
+                "error": {
+                    "code": -32601,
+                    "message": f"Method {method} not found"
+                },
+                "id": request_id
+            }
+        if 'id' not in request:
+            return None
+        return response
+
     async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
         """Handle individual client connection"""
         peer = writer.get_extra_info('peername')
@@ -248,77 +613,47 @@ class ToolServer:
         logger.info(f"[SERVER->CLIENT {client_id}] New client connection established")
         request_count = 0
         
+        buf = bytearray()
         try:
             while True:
                 try:
-                    # Read request line with timeout
-                    logger.debug(f"[SERVER] Waiting for request from client {client_id}...")
-                    data = await asyncio.wait_for(reader.readline(), timeout=30.0)
-                    if not data:
-                        logger.info(f"[CLIENT {client_id}->SERVER] Connection closed (EOF received)")
-                        break
-                    
-                    request_count += 1
-                    request_str = data.decode().strip()
-                    logger.info(f"[CLIENT {client_id}->SERVER] Request #{request_count} received: {request_str[:200]}{'...' if len(request_str) > 200 else ''}")
-                    
-                    start_time = asyncio.get_event_loop().time()
-                    try:
-                        request = json.loads(request_str)
-                        method = request.get('method')
-                        params = request.get('params', {})
-                        request_id = request.get('id')
-                        
-                        logger.debug(f"[SERVER] Processing request from {client_id} - Method: {method}, ID: {request_id}")
-                        logger.debug(f"[SERVER] Request parameters from {client_id}: {json.dumps(params, indent=2)}")
-                        
-                        if method in self.methods:
-                            result = await self.methods[method](params)
-                            response = {
-                                "jsonrpc": "2.0",
-                                "result": result,
-                                "id": request_id
-                            }
-                        else:
-                            logger.warning(f"[SERVER] Method not found for client {client_id}: {method}")
-                            response = {
-                                "jsonrpc": "2.0",
-                                "error": {
-                                    "code": -32601,
-                                    "message": f"Method {method} not found"
-                                },
-                                "id": request_id
-                            }
-                        
-                        # Calculate and log processing time
-                        processing_time = asyncio.get_event_loop().time() - start_time
-                        logger.info(f"[SERVER] Request from {client_id} completed in {processing_time:.3f}s")
-                        
-                        # Send response
-                        logger.debug(f"[SERVER->CLIENT {client_id}] Preparing to send response...")
-                        response_str = json.dumps(response) + "\n"
-                        writer.write(response_str.encode())
-                        await writer.drain()
-                        logger.info(f"[SERVER->CLIENT {client_id}] Response sent for request #{request_count}: {response_str[:200]}{'...' if len(response_str) > 200 else ''}")
-                        
-                    except json.JSONDecodeError as e:
-                        logger.error(f"[CLIENT {client_id}->SERVER] Invalid JSON in request #{request_count}: {str(e)}")
-                        error_response = {
-                            "jsonrpc": "2.0",
-                            "error": {
-                                "code": -32700,
-                                "message": f"Parse error: {str(e)}"
-                            },
-                            "id": None
-                        }
-                        logger.debug(f"[SERVER->CLIENT {client_id}] Sending error response for invalid JSON")
-                        writer.write((json.dumps(error_response) + "\n").encode())
-                        await writer.drain()
-                        
+                    chunk = await asyncio.wait_for(reader.read(65536), timeout=30.0)
                 except asyncio.TimeoutError:
                     logger.warning(f"[CLIENT {client_id}->SERVER] Request timeout after 30 seconds")
                     break
-                    
+                if not chunk:
+                    logger.info(f"[CLIENT {client_id}->SERVER] Connection closed (EOF received)")
+                    break
+
+                buf += chunk
+                if len(buf) > 16 * 1024 * 1024:
+                    logger.error(f"[CLIENT {client_id}->SERVER] Oversized request line, closing connection")
+                    break
+
+                # Split out every complete line already buffered, so a
+                # pipelining client pays one read and one drain per burst
+                lines = []
+                while (nl := buf.find(b'\n')) != -1:
+                    lines.append(bytes(buf[:nl]))
+                    del buf[:nl + 1]
+                if not lines:
+                    continue
+
+                start_ns = time.monotonic_ns()
+                responses = await asyncio.gather(
+                    *(self._process_line(line, client_id) for line in lines)
+                )
+                request_count += len(lines)
+
+                out = [response for response in responses if response is not None]
+                if out:
+                    writer.writelines(out)
+                    await writer.drain()
+
+                logger.debug("[SERVER] %d request(s) from %s completed in %.3fs",
+                             len(lines), client_id,
+                             (time.monotonic_ns() - start_ns) / 1e9)
+
         except Exception as e:
             logger.error(f"[SERVER] Connection error with client {client_id}: {str(e)}", exc_info=True)
         finally:
@@ -329,83 +664,56 @@ class ToolServer:
     async def handle_stdio(self):
         """Handle stdio communication"""
         logger.info("Starting server in stdio communication mode")
-        
+
         # Configure binary mode for Windows
         if sys.platform == 'win32':
             import msvcrt
             msvcrt.setmode(sys.stdin.fileno(), os.O_BINARY)
             msvcrt.setmode(sys.stdout.fileno(), os.O_BINARY)
             msvcrt.setmode(sys.stderr.fileno(), os.O_BINARY)
-            
+
+        # Hook stdin into the event loop: a blocking readline would
+        # stall every in-flight handler between requests
+        loop = asyncio.get_event_loop()
+        reader = asyncio.StreamReader()
+        protocol = asyncio.StreamReaderProtocol(reader)
+        await loop.connect_read_pipe(lambda: protocol, sys.stdin)
+
         request_count = 0
-        
-        # Wait for and process requests
+        buf = bytearray()
+
+        # Same batched read/split/dispatch loop as handle_client
         while True:
             try:
-                # Read request
-                line = sys.stdin.buffer.readline()
-                if not line:
+                chunk = await reader.read(65536)
+                if not chunk:
                     logger.warning("Received EOF on stdin")
                     break
-                
-                request_count += 1
-                request_str = line.decode('utf-8').strip()
-                logger.info(f"Request #{request_count} received: {request_str}")
-                
-                try:
-                    # Parse request
-                    request = json.loads(request_str)
-                    method = request.get('method')
-                    params = request.get('params', {})
-                    request_id = request.get('id')
-                    
-                    # Handle request
-                    try:
-                        result = await self.methods[method](params)
-                        response = {
-                            "jsonrpc": "2.0",
-                            "result": result,
-                            "id": request_id
-                        }
-                    except KeyError:
-                        response = {
-                            "jsonrpc": "2.0",
-                            "error": {
-                                "code": -32601,
-                                "message": f"Method {method} not found"
-                            },
-                            "id": request_id
-                        }
-                    except Exception as e:
-                        response = {
-                            "jsonrpc": "2.0",
-                            "error": {
-                                "code": -32000,
-                                "message": str(e)
-                            },
-                            "id": request_id
-                        }
-                        
-                    # Send response
-                    response_str = json.dumps(response) + "\n"
-                    response_bytes = response_str.encode('utf-8')
-                    sys.stdout.buffer.write(response_bytes)
-                    sys.stdout.buffer.flush()
-                    logger.info(f"Response sent for request #{request_count}")
-                    
-                except json.JSONDecodeError as e:
-                    error_response = {
-                        "jsonrpc": "2.0",
-                        "error": {
-                            "code": -32700,
-                            "message": f"Parse error: {str(e)}"
-                        },
-                        "id": None
-                    }
-                    error_bytes = (json.dumps(error_response) + "\n").encode('utf-8')
-                    sys.stdout.buffer.write(error_bytes)
+
+                buf += chunk
+                if len(buf) > 16 * 1024 * 1024:
+                    logger.error("Oversized request line on stdin, shutting down")
+                    break
+
+                lines = []
+                while (nl := buf.find(b'\n')) != -1:
+                    lines.append(bytes(buf[:nl]))
+                    del buf[:nl + 1]
+                if not lines:
+                    continue
+
+                responses = await asyncio.gather(
+                    *(self._process_line(line, "stdio") for line in lines)
+                )
+                request_count += len(lines)
+
+                out = [response for response in responses if response is not None]
+                if out:
+                    sys.stdout.buffer.write(b"".join(out))
                     sys.stdout.buffer.flush()
-                    
+                logger.debug("Processed %d stdio request(s), %d total",
+                             len(lines), request_count)
+
             except Exception as e:
                 logger.error(f"Fatal error in stdio handler: {str(e)}", exc_info=True)
                 try:
@@ -417,32 +725,31 @@ class ToolServer:
                         },
                         "id": None
                     }
-                    error_bytes = (json.dumps(error_response) + "\n").encode('utf-8')
+                    error_bytes = _dumps(error_response) + b"\n"
                     sys.stdout.buffer.write(error_bytes)
                     sys.stdout.buffer.flush()
                 except Exception as write_error:
                     logger.critical(f"Failed to write error response: {str(write_error)}", exc_info=True)
                 continue  # Keep server running even after errors
-                
+
         logger.warning(f"Stdio handler loop ended after processing {request_count} requests")
         
     def _write_response(self, response: Dict):
         """Helper method to write JSON-RPC response to stdout"""
         try:
-            response_str = json.dumps(response) + "\n"
-            logger.debug(f"Preparing to write response [{len(response_str)} chars]")
-            logger.debug(f"Response content: {response_str[:100]}{'...' if len(response_str) > 100 else ''}")
-            logger.debug(f"stdout state before write - closed: {sys.stdout.closed}, isatty: {sys.stdout.isatty()}")
-            
-            sys.stdout.write(response_str)
-            sys.stdout.flush()
-            
+            response_bytes = _dumps(response) + b"\n"
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Preparing to write response [%d bytes]: %.100s",
+                             len(response_bytes), response_bytes)
+
+            sys.stdout.buffer.write(response_bytes)
+            sys.stdout.buffer.flush()
+
             logger.debug("Response written and flushed successfully")
-            logger.debug(f"stdout state after write - closed: {sys.stdout.closed}, isatty: {sys.stdout.isatty()}")
         except Exception as e:
             logger.error(f"Error writing response: {str(e)}", exc_info=True)
             # Try to log the failed response for debugging
-            logger.error(f"Failed response content: {json.dumps(response, indent=2)}")
+            logger.error("Failed response content: %s", response)
 
 async def start_server(host: str = 'localhost', port: int = 8000):
     """Start the TCP server"""
@@ -474,8 +781,10 @@ async def start_server(host: str = 'localhost', port: int = 8000):
 if __name__ == "__main__":
     import argparse
     import platform
-    import msvcrt
-    
+
+    if sys.platform == 'win32':
+        import msvcrt
+
     try:
         # Log system information
         logger.info(f"Starting tool server on {platform.system()} {platform.release()}")